@@ -0,0 +1,74 @@
+"""
+Command-line entry points.
+
+    python -m app.cli payroll-run --year 2025 --month 3 [--save] [--workers 4]
+    python -m app.cli holidays-export --from-year 2000 --to-year 2060 --out holidays.json
+    python -m app.cli init-db                 # tables + admin, for STARTUP_MODE=fast
+    python -m app.cli seed-admin
+"""
+
+import argparse
+import json
+import sys
+
+
+def _payroll_run(args):
+    from .services.payroll_service import run_payroll
+
+    user_ids = [int(u) for u in args.users.split(",")] if args.users else None
+    for record in run_payroll(args.year, args.month, save=args.save, workers=args.workers, user_ids=user_ids):
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+
+def _holidays_export(args):
+    from .services.holiday_service import holiday_index
+
+    holiday_index.export(args.out, args.from_year, args.to_year)
+
+
+def _init_db(args):
+    from .main import create_tables, seed_admin
+
+    create_tables()
+    if not args.no_admin:
+        seed_admin()
+
+
+def _seed_admin(args):
+    from .main import seed_admin
+
+    seed_admin()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    payroll = commands.add_parser("payroll-run", help="Beregn måned for alle aktive brukere (NDJSON)")
+    payroll.add_argument("--year", type=int, required=True)
+    payroll.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="MONTH")
+    payroll.add_argument("--save", action="store_true", help="Lagre månedssammendrag (låste måneder hoppes over)")
+    payroll.add_argument("--workers", type=int, default=None, help="Antall prosesser (standard: PAYROLL_WORKERS)")
+    payroll.add_argument("--users", default=None, help="Kommaseparerte bruker-IDer (standard: alle aktive)")
+    payroll.set_defaults(func=_payroll_run)
+
+    export = commands.add_parser("holidays-export", help="Skriv helligdagsindeks til fil (HOLIDAY_INDEX_FILE)")
+    export.add_argument("--from-year", type=int, required=True)
+    export.add_argument("--to-year", type=int, required=True)
+    export.add_argument("--out", required=True)
+    export.set_defaults(func=_holidays_export)
+
+    init_db = commands.add_parser("init-db", help="Opprett tabeller og standard admin (for STARTUP_MODE=fast)")
+    init_db.add_argument("--no-admin", action="store_true", help="Ikke opprett admin-bruker")
+    init_db.set_defaults(func=_init_db)
+
+    seed = commands.add_parser("seed-admin", help="Opprett standard admin (ADMIN_EMAIL) om den mangler")
+    seed.set_defaults(func=_seed_admin)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 import secrets
 
 
@@ -11,6 +11,63 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str = "admin@lonnapp.no"
     ADMIN_PASSWORD: str = "Admin1234!"
 
+    # Shifts per bulk UPDATE when recalculating after a settings change
+    RECALC_CHUNK_SIZE: int = 500
+    # Distinct shift shapes kept by the calculate_shift LRU cache (0 = off)
+    SHIFT_CACHE_SIZE: int = 10000
+    # Payroll run: worker processes (0 = CPU count) and users per shift query
+    PAYROLL_WORKERS: int = 0
+    PAYROLL_CHUNK_USERS: int = 50
+    # JSON holiday index to preload (python -m app.cli holidays-export)
+    HOLIDAY_INDEX_FILE: Optional[str] = None
+
+    # Database profile: "tuned" applies the settings below, "plain" is a bare
+    # engine with driver defaults (for comparison and troubleshooting)
+    DB_PROFILE: Literal["tuned", "plain"] = "tuned"
+    # SQLite pragmas, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024   # bytes, 0 = off
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    # Connection pool (file databases and servers)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0               # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800                 # seconds, -1 = never
+    DB_POOL_PRE_PING: bool = True               # ignored for SQLite
+    # PostgreSQL statement_timeout, 0 = off
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # Serve the shifts, calculator, admin and users routers and authentication
+    # through an AsyncSession (aiosqlite/asyncpg); false = sync sessions in the threadpool
+    DB_ASYNC: bool = True
+
+    # Authenticated-user cache: principals kept per process (0 = off) and for how long
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_S: float = 60.0
+    # SQLite file shared by the workers on one host to broadcast invalidations
+    # (None = local only; other workers see a change when their entry expires)
+    AUTH_CACHE_BUS_FILE: Optional[str] = None
+    AUTH_CACHE_BUS_POLL_S: float = 0.5
+
+    # bcrypt cost for new hashes; hashes at another cost are redone on login
+    BCRYPT_ROUNDS: int = 12
+    # Password hashing process pool (0 = CPU count) and how many hash/verify
+    # jobs may be queued or running before requests are rejected with 503
+    PASSWORD_WORKERS: int = 0
+    PASSWORD_QUEUE_LIMIT: int = 64
+
+    # "full" creates tables and seeds the admin at every boot; "fast" skips
+    # both (run `python -m app.cli init-db` once per deploy instead)
+    STARTUP_MODE: Literal["full", "fast"] = "full"
+
+    # Largest page GET /api/shifts serves with ?limit= (no limit = whole range)
+    SHIFT_PAGE_MAX: int = 1000
+    # Changes per GET /api/sync page; a single write touching more is sent whole
+    SYNC_PAGE_MAX: int = 1000
+    # Admin analytics results kept per (grouping, period), reused until a user's data changes
+    ANALYTICS_CACHE_SIZE: int = 256
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,17 +1,268 @@
-from sqlalchemy import create_engine
+"""
+Engine, session factory and connection-pool metrics.
+
+The engine follows the database profile in settings (DB_PROFILE). "tuned"
+applies the SQLite pragmas (WAL, synchronous, busy timeout, mmap, cache
+size) on every new connection, or pool sizing, pre-ping and a statement
+timeout for PostgreSQL. "plain" is a bare engine with driver defaults.
+Either way the pool reports checkout counts and wait times.
+
+With DB_ASYNC the async routers get an AsyncSession on a second engine for
+the same database (aiosqlite, or asyncpg for PostgreSQL). Their handlers
+run sync query code through `run_db`, which uses `AsyncSession.run_sync`
+there and Starlette's threadpool for a sync Session, so both paths share
+one implementation. run_sync executes on the event loop thread, so routes
+that compute rather than wait take `get_compute_session` instead.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
 from .config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-)
+
+class PoolMetrics:
+    """Checkout counters and recent checkout wait times of one engine's pool."""
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self._waits: "deque[float]" = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.wait_count = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+
+    def connected(self, *_):
+        with self._lock:
+            self.connects += 1
+
+    def checked_out(self, *_):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self, *_):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def waited(self, ms: float, timed_out: bool = False):
+        with self._lock:
+            self._waits.append(ms)
+            self.wait_count += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            waited = len(waits)
+
+            def pct(p: float) -> Optional[float]:
+                return round(waits[min(waited - 1, int(p * waited))], 3) if waited else None
+
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "mean": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else None,
+                    "max": round(self.wait_max_ms, 3),
+                    "p50": pct(0.50),
+                    "p95": pct(0.95),
+                    "p99": pct(0.99),
+                    "window": waited,
+                },
+            }
+
+
+def _timed_queue_pool(metrics: PoolMetrics, base=QueuePool):
+    # A subclass per engine so pool.recreate() (engine.dispose) keeps the timing.
+    class TimedQueuePool(base):
+        def connect(self):
+            t0 = time.perf_counter()
+            try:
+                conn = super().connect()
+            except PoolTimeoutError:
+                metrics.waited((time.perf_counter() - t0) * 1000, timed_out=True)
+                raise
+            metrics.waited((time.perf_counter() - t0) * 1000)
+            return conn
+
+    return TimedQueuePool
+
+
+def _sqlite_pragmas(dbapi_connection, _record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={-int(settings.SQLITE_CACHE_SIZE_KB)}")  # negative = KiB
+    finally:
+        cursor.close()
+
+
+def _is_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def _engine_options(url: URL, profile: str, metrics: Optional[PoolMetrics], pool_base) -> Dict[str, Any]:
+    sqlite = url.get_backend_name() == "sqlite"
+    memory = _is_memory(url)
+    tuned = profile == "tuned"
+
+    options: Dict[str, Any] = {}
+    connect_args: Dict[str, Any] = {}
+    if sqlite:
+        connect_args["check_same_thread"] = False
+    if metrics is not None and not memory:
+        options["poolclass"] = _timed_queue_pool(metrics, pool_base)
+    if tuned and not memory:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING and not sqlite,
+        )
+    if tuned and url.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        timeout = str(int(settings.DB_STATEMENT_TIMEOUT_MS))
+        if url.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {"statement_timeout": timeout}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+    options["connect_args"] = connect_args
+    return options
+
+
+def _listen(engine: Engine, url: URL, profile: str, metrics: Optional[PoolMetrics]):
+    if profile == "tuned" and url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas)
+    if metrics is not None:
+        event.listen(engine, "connect", metrics.connected)
+        event.listen(engine, "checkout", metrics.checked_out)
+        event.listen(engine, "checkin", metrics.checked_in)
+
+
+def build_engine(url: str, profile: str = "tuned", metrics: Optional[PoolMetrics] = None) -> Engine:
+    """Create an engine for url with the given profile ("tuned" or "plain")."""
+    parsed = make_url(url)
+    engine = create_engine(parsed, **_engine_options(parsed, profile, metrics, QueuePool))
+    _listen(engine, parsed, profile, metrics)
+    return engine
+
+
+def async_url(url: str) -> URL:
+    """The async-driver form of a sync database URL (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg")
+    raise ValueError(f"no async driver configured for {backend}")
+
+
+def build_async_engine(url: str, profile: str = "tuned", metrics: Optional[PoolMetrics] = None) -> AsyncEngine:
+    """Async counterpart of build_engine, for the same database."""
+    parsed = async_url(url)
+    options = _engine_options(parsed, profile, metrics, AsyncAdaptedQueuePool)
+    if "poolclass" not in options and not _is_memory(parsed):
+        # aiosqlite defaults to NullPool for files, which would reconnect and
+        # re-apply the pragmas on every request.
+        options["poolclass"] = AsyncAdaptedQueuePool
+    engine = create_async_engine(parsed, **options)
+    _listen(engine.sync_engine, parsed, profile, metrics)
+    return engine
+
+
+pool_metrics = PoolMetrics()
+engine = build_engine(settings.DATABASE_URL, settings.DB_PROFILE, pool_metrics)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_pool_metrics = PoolMetrics()
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+if settings.DB_ASYNC:
+    async_engine = build_async_engine(settings.DATABASE_URL, settings.DB_PROFILE, async_pool_metrics)
+    # Objects are returned to the response serializer after the session
+    # closes, where an expired attribute could not be loaded without I/O.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+AnySession = Union[Session, AsyncSession]
+T = TypeVar("T")
+
+
+def upsert_insert(db: Session, model):
+    """INSERT for the session's dialect, which has on_conflict_do_update/do_nothing."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
+
+
+def _pool_info(pool, metrics: PoolMetrics) -> Dict[str, Any]:
+    configured = {}
+    if isinstance(pool, QueuePool):
+        configured = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeout_s": pool.timeout(),
+        }
+    return {"pool_class": type(pool).__name__, **configured, **metrics.stats()}
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Profile, pool configuration and checkout metrics of the app engines."""
+    stats = {
+        "profile": settings.DB_PROFILE,
+        "dialect": engine.dialect.name,
+        "async": settings.DB_ASYNC,
+        **_pool_info(engine.pool, pool_metrics),
+    }
+    if async_engine is not None:
+        stats["async_pool"] = _pool_info(async_engine.sync_engine.pool, async_pool_metrics)
+    return stats
+
+
+def reset_pool_stats():
+    pool_metrics.reset()
+    async_pool_metrics.reset()
+
 
 def get_db():
     db = SessionLocal()
@@ -19,3 +270,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for the async routers: an AsyncSession with DB_ASYNC, else a sync Session
+get_session = get_async_db if settings.DB_ASYNC else get_db
+# Dependency for handlers whose work is CPU-bound (the wage engine over many
+# shifts, large result sets): always a sync Session, so run_db runs the whole
+# call in the threadpool. AsyncSession.run_sync would run it on the event loop.
+get_compute_session = get_db
+
+
+async def run_db(db: AnySession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call fn(session, *args, **kwargs) without blocking the event loop, for either session kind."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,13 +1,25 @@
 """
 Lønns- og Vaktapp – FastAPI backend entry point.
+
+With STARTUP_MODE=fast the app does no schema creation or admin seeding at
+boot; run `python -m app.cli init-db` once per deploy instead. Import and
+startup phase timings are reported by GET /api/admin/metrics/startup.
 """
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from .utils.startup import startup_timings
+
+with startup_timings.phase("import.framework"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
 
-from .database import Base, engine
-from .routers import auth, users, wage_settings, shift_templates, shifts, calculator, import_data, export, admin
-from .config import settings
+with startup_timings.phase("import.database"):
+    from .config import settings
+    from .database import Base, async_engine, engine
+
+with startup_timings.phase("import.routers"):
+    from .routers import auth, users, wage_settings, shift_templates, shifts, calculator, import_data, export, admin, sync, calendar
+    from .services.password_service import password_hasher
+    from .services.principal_cache import invalidation_bus
 
 
 def create_tables():
@@ -39,6 +51,8 @@ def seed_admin():
         db.close()
 
 
+startup_timings.begin("app.build")
+
 app = FastAPI(
     title="Lønns- og Vaktapp API",
     description="Backend API for lønns- og vaktregistrering",
@@ -51,13 +65,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
 @app.on_event("startup")
 async def startup():
-    create_tables()
-    seed_admin()
+    if settings.STARTUP_MODE == "full":
+        with startup_timings.phase("startup.create_tables"):
+            create_tables()
+        with startup_timings.phase("startup.seed_admin"):
+            seed_admin()
+    password_hasher.start()
+    if invalidation_bus is not None:
+        invalidation_bus.start()
+    startup_timings.ready(settings.STARTUP_MODE)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 app.include_router(auth.router)
@@ -69,6 +98,10 @@ app.include_router(calculator.router)
 app.include_router(import_data.router)
 app.include_router(export.router)
 app.include_router(admin.router)
+app.include_router(sync.router)
+app.include_router(calendar.router)
+
+startup_timings.end("app.build")
 
 
 @app.get("/api/health")
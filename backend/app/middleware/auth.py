@@ -1,14 +1,23 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import AnySession, get_session, run_db
 from ..models.user import User
+from ..services.principal_cache import Principal, principal_cache
 from ..utils.security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    row = db.query(User.id, User.is_admin, User.is_active, User.name).filter(User.id == user_id).first()
+    return Principal(row.id, row.is_admin, row.is_active, row.name) if row else None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AnySession = Depends(get_session)) -> Principal:
+    """The authenticated user's principal; routes that need the full row load it by id."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Ugyldig token",
@@ -17,13 +26,19 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     token_data = decode_token(token)
     if token_data is None:
         raise credentials_exception
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    if user is None or not user.is_active:
+    user = principal_cache.get(token_data.user_id)
+    if user is None:
+        generation = principal_cache.generation
+        user = await run_db(db, _load_principal, token_data.user_id)
+        if user is None:
+            raise credentials_exception
+        principal_cache.put(user, generation)
+    if not user.is_active:
         raise credentials_exception
     return user
 
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Kun for administrator")
     return current_user
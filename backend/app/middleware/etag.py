@@ -0,0 +1,66 @@
+"""
+Conditional GETs for user data.
+
+GET endpoints that serve a user's data depend on `user_etag()`. It reads the
+user's data revision (one primary-key lookup) and answers a matching
+If-None-Match with 304 before the handler runs its queries or the wage
+engine. Otherwise it sets a strong ETag on the response and returns it, for
+handlers that build their own Response.
+
+The revision is read before the data, so a write landing in between can only
+make the ETag older than the body; the client then refetches once more,
+never keeps stale data.
+"""
+
+from datetime import date
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from ..database import AnySession, get_session, run_db
+from ..services.principal_cache import Principal
+from ..services.rate_plan import ENGINE_VERSION
+from ..services.revision_service import current_revision
+from .auth import get_current_user
+
+# Bump when a response format changes, so clients do not keep old bodies.
+# ENGINE_VERSION is part of the tag as well, so pay figures cached under
+# older engine rules are refetched without any write by the user.
+ETAG_VERSION = "1"
+_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(user_id: int, revision: int, day: Optional[date] = None) -> str:
+    tag = f"{ETAG_VERSION}.{ENGINE_VERSION}-{user_id}-{revision}"
+    return f'"{tag}-{day.isoformat()}"' if day else f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison: W/"x" matches "x".
+    candidates = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+
+
+def user_etag(daily: bool = False):
+    """Dependency for GET routes; `daily` for responses that also depend on today's date."""
+
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AnySession = Depends(get_session),
+        current_user: Principal = Depends(get_current_user),
+    ) -> str:
+        revision = await run_db(db, current_revision, current_user.id)
+        etag = make_etag(current_user.id, revision, date.today() if daily else None)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(304, headers=etag_headers(etag))
+        response.headers.update(etag_headers(etag))
+        return etag
+
+    return dependency
@@ -3,3 +3,7 @@ from .wage_settings import WageSettings, CustomAllowance
 from .shift_template import ShiftTemplate
 from .shift import Shift
 from .month_summary import MonthSummary
+from .shift_aggregate import MonthAggregate, WeekAggregate
+from .user_revision import UserRevision
+from .sync_change import SyncChange
+from .data_generation import DataGeneration
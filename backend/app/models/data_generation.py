@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer
+from ..database import Base
+
+
+class DataGeneration(Base):
+    """
+    Single-row counter bumped with every user revision and on user deletion.
+    It only grows, so caches over all users' data can be keyed on it.
+    """
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)      # always 1
+    generation = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,63 @@
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class MonthAggregate(Base):
+    """Running sums of the stored Shift values per user and month.
+
+    Maintained by deltas whenever shifts are written (see
+    services/aggregate_service.py).
+    """
+    __tablename__ = "month_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+
+    shift_count = Column(Integer, default=0)
+    total_hours = Column(Float, default=0.0)
+    base_hours = Column(Float, default=0.0)
+    evening_hours = Column(Float, default=0.0)
+    night_hours = Column(Float, default=0.0)
+    weekend_hours = Column(Float, default=0.0)
+    holiday_hours = Column(Float, default=0.0)
+    overtime_50_hours = Column(Float, default=0.0)
+    overtime_100_hours = Column(Float, default=0.0)
+    gross_pay = Column(Float, default=0.0)
+
+    # RatePlan.version every shift in the month was calculated with;
+    # NULL when mixed or unknown.
+    settings_version = Column(String(16), nullable=True)
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    user = relationship("User", back_populates="month_aggregates")
+
+    __table_args__ = (UniqueConstraint("user_id", "year", "month", name="uq_agg_user_year_month"),)
+
+
+class WeekAggregate(Base):
+    """Hours per ISO week within a month, for the weekly overtime check."""
+    __tablename__ = "week_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    iso_year = Column(Integer, nullable=False)
+    iso_week = Column(Integer, nullable=False)
+
+    shift_count = Column(Integer, default=0)
+    total_hours = Column(Float, default=0.0)
+
+    user = relationship("User", back_populates="week_aggregates")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "year", "month", "iso_year", "iso_week", name="uq_agg_user_month_week"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+
+class SyncChange(Base):
+    """
+    Latest change to one entity of a user: the revision that wrote it and
+    whether it was a delete (a tombstone). One row per entity, so the log
+    grows with the user's data, not with the number of writes.
+    """
+    __tablename__ = "sync_changes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String(20), nullable=False)     # shift, shift_template, wage_settings, month_summary
+    entity_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+    user = relationship("User", back_populates="sync_changes")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "entity", "entity_id", name="uq_sync_changes_entity"),
+        Index("ix_sync_changes_user_id_revision", "user_id", "revision"),
+    )
@@ -31,3 +31,7 @@ class User(Base):
     shift_templates = relationship("ShiftTemplate", back_populates="user", cascade="all, delete-orphan")
     shifts = relationship("Shift", back_populates="user", cascade="all, delete-orphan")
     month_summaries = relationship("MonthSummary", back_populates="user", cascade="all, delete-orphan")
+    month_aggregates = relationship("MonthAggregate", back_populates="user", cascade="all, delete-orphan")
+    week_aggregates = relationship("WeekAggregate", back_populates="user", cascade="all, delete-orphan")
+    data_revision = relationship("UserRevision", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    sync_changes = relationship("SyncChange", back_populates="user", cascade="all, delete-orphan")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+
+class UserRevision(Base):
+    """Counter bumped by every write to a user's data; the source of ETags."""
+    __tablename__ = "user_revisions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="data_revision")
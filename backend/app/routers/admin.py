@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from datetime import date
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
-from ..database import get_db
+from ..database import AnySession, get_session, pool_stats, reset_pool_stats, run_db
 from ..models.user import User
 from ..models.shift import Shift
 from ..schemas.user import UserAdminOut
 from ..middleware.auth import get_admin_user
+from ..services.principal_cache import Principal, cache_stats, invalidate_principal, principal_cache
+from ..services.aggregate_service import check_aggregates
+from ..services.analytics_service import ANALYTICS_MAX_DAYS, GroupBy, analytics_cache, shift_analytics
+from ..services import recalc_service
+from ..services.payroll_service import max_workers, run_payroll
+from ..services.calc_cache import shift_cache
+from ..services.password_service import password_hasher
+from ..services.revision_service import bump_generation
+from ..utils.startup import startup_timings
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
-@router.get("/stats")
-def get_stats(db: Session = Depends(get_db), _: User = Depends(get_admin_user)):
+def _stats(db: Session) -> dict:
     total_users = db.query(func.count(User.id)).scalar()
     active_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()  # noqa: E712
     total_shifts = db.query(func.count(Shift.id)).scalar()
@@ -23,12 +35,26 @@ def get_stats(db: Session = Depends(get_db), _: User = Depends(get_admin_user)):
     }
 
 
-@router.get("/users", response_model=List[UserAdminOut])
-def list_users(
-    search: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_admin_user),
+@router.get("/stats")
+async def get_stats(db: AnySession = Depends(get_session), _: Principal = Depends(get_admin_user)):
+    return await run_db(db, _stats)
+
+
+@router.get("/analytics/{group_by}")
+async def analytics(
+    group_by: GroupBy,
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: AnySession = Depends(get_session),
+    _: Principal = Depends(get_admin_user),
 ):
+    """Hours, gross pay, overtime and night/weekend share per user, workplace or month."""
+    if to_date < from_date or (to_date - from_date).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(400, "Ugyldig periode")
+    return await run_db(db, shift_analytics, from_date, to_date, group_by)
+
+
+def _list_users(db: Session, search: Optional[str]) -> List[User]:
     q = db.query(User).filter(User.is_admin == False)  # noqa: E712
     if search:
         like = f"%{search}%"
@@ -38,45 +64,162 @@ def list_users(
     return q.order_by(User.created_at.desc()).all()
 
 
-@router.get("/users/{user_id}", response_model=UserAdminOut)
-def get_user(user_id: int, db: Session = Depends(get_db), _: User = Depends(get_admin_user)):
+@router.get("/users", response_model=List[UserAdminOut])
+async def list_users(
+    search: Optional[str] = Query(None),
+    db: AnySession = Depends(get_session),
+    _: Principal = Depends(get_admin_user),
+):
+    return await run_db(db, _list_users, search)
+
+
+def _get_user(db: Session, user_id: int) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(404, "Bruker ikke funnet")
     return user
 
 
-@router.patch("/users/{user_id}/deactivate", response_model=UserAdminOut)
-def deactivate_user(user_id: int, db: Session = Depends(get_db), admin: User = Depends(get_admin_user)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(404, "Bruker ikke funnet")
-    if user.id == admin.id:
+@router.get("/users/{user_id}", response_model=UserAdminOut)
+async def get_user(user_id: int, db: AnySession = Depends(get_session), _: Principal = Depends(get_admin_user)):
+    return await run_db(db, _get_user, user_id)
+
+
+def _set_active(db: Session, user_id: int, active: bool, admin_id: int) -> User:
+    user = _get_user(db, user_id)
+    if not active and user.id == admin_id:
         raise HTTPException(400, "Kan ikke deaktivere deg selv")
-    user.is_active = False
+    user.is_active = active
     db.commit()
     db.refresh(user)
+    invalidate_principal(user_id)
     return user
 
 
+@router.patch("/users/{user_id}/deactivate", response_model=UserAdminOut)
+async def deactivate_user(user_id: int, db: AnySession = Depends(get_session), admin: Principal = Depends(get_admin_user)):
+    return await run_db(db, _set_active, user_id, False, admin.id)
+
+
 @router.patch("/users/{user_id}/activate", response_model=UserAdminOut)
-def activate_user(user_id: int, db: Session = Depends(get_db), _: User = Depends(get_admin_user)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(404, "Bruker ikke funnet")
-    user.is_active = True
-    db.commit()
-    db.refresh(user)
-    return user
+async def activate_user(user_id: int, db: AnySession = Depends(get_session), admin: Principal = Depends(get_admin_user)):
+    return await run_db(db, _set_active, user_id, True, admin.id)
 
 
-@router.delete("/users/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), admin: User = Depends(get_admin_user)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(404, "Bruker ikke funnet")
-    if user.id == admin.id:
+def _delete_user(db: Session, user_id: int, admin_id: int):
+    user = _get_user(db, user_id)
+    if user.id == admin_id:
         raise HTTPException(400, "Kan ikke slette deg selv")
     db.delete(user)
+    bump_generation(db)
     db.commit()
+    invalidate_principal(user_id)
+
+
+@router.delete("/users/{user_id}")
+async def delete_user(user_id: int, db: AnySession = Depends(get_session), admin: Principal = Depends(get_admin_user)):
+    await run_db(db, _delete_user, user_id, admin.id)
     return {"detail": "Bruker slettet"}
+
+
+@router.post("/aggregates/check")
+async def check_month_aggregates(
+    user_id: Optional[int] = Query(None),
+    repair: bool = Query(False),
+    db: AnySession = Depends(get_session),
+    _: Principal = Depends(get_admin_user),
+):
+    """Rebuild month/week aggregates from stored shifts and report drift."""
+    return await run_db(db, check_aggregates, user_id=user_id, repair=repair)
+
+
+@router.post("/recalculate")
+async def recalculate_all(background_tasks: BackgroundTasks, _: Principal = Depends(get_admin_user)):
+    """Recalculate the stored shifts of every user in the background."""
+    job = recalc_service.start_job(None)
+    background_tasks.add_task(recalc_service.run_job, job.id)
+    return job.to_dict()
+
+
+@router.get("/recalculate/{job_id}")
+async def recalculate_status(job_id: str, _: Principal = Depends(get_admin_user)):
+    job = recalc_service.get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Omberegning ikke funnet")
+    return job.to_dict()
+
+
+@router.post("/payroll-run")
+async def payroll_run(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    save: bool = Query(False),
+    workers: Optional[int] = Query(None, ge=1, le=max_workers()),
+    _: Principal = Depends(get_admin_user),
+):
+    """
+    Compute (and optionally save) the month for every active user. Streams
+    NDJSON: one line per user as it finishes, then a summary line.
+    """
+    lines = (json.dumps(record) + "\n" for record in run_payroll(year, month, save=save, workers=workers))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/metrics/engine-cache")
+async def engine_cache_stats(_: Principal = Depends(get_admin_user)):
+    """Hit/miss/eviction counters of the shift calculation cache."""
+    return shift_cache.stats()
+
+
+@router.delete("/metrics/engine-cache")
+async def clear_engine_cache(_: Principal = Depends(get_admin_user)):
+    shift_cache.clear()
+    return shift_cache.stats()
+
+
+@router.get("/metrics/analytics-cache")
+async def analytics_cache_stats(_: Principal = Depends(get_admin_user)):
+    """Hit/miss/eviction counters of the admin analytics cache."""
+    return analytics_cache.stats()
+
+
+@router.delete("/metrics/analytics-cache")
+async def clear_analytics_cache(_: Principal = Depends(get_admin_user)):
+    analytics_cache.clear()
+    return analytics_cache.stats()
+
+
+@router.get("/metrics/auth-cache")
+async def auth_cache_stats(_: Principal = Depends(get_admin_user)):
+    """Hit/miss/invalidation counters of the authenticated-user cache."""
+    return cache_stats()
+
+
+@router.delete("/metrics/auth-cache")
+async def clear_auth_cache(_: Principal = Depends(get_admin_user)):
+    principal_cache.clear()
+    return cache_stats()
+
+
+@router.get("/metrics/password-hashing")
+async def password_hashing_stats(_: Principal = Depends(get_admin_user)):
+    """Queue depth, rejections, rehashes and latency of the password hashing pool."""
+    return password_hasher.stats()
+
+
+@router.get("/metrics/startup")
+async def startup_stats(_: Principal = Depends(get_admin_user)):
+    """Import and startup phase timings of this worker, and deferred imports so far."""
+    return startup_timings.report()
+
+
+@router.get("/metrics/db-pool")
+async def db_pool_stats(_: Principal = Depends(get_admin_user)):
+    """Database profile, pool size and checkout/wait metrics."""
+    return pool_stats()
+
+
+@router.delete("/metrics/db-pool")
+async def reset_db_pool_stats(_: Principal = Depends(get_admin_user)):
+    reset_pool_stats()
+    return pool_stats()
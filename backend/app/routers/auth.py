@@ -1,24 +1,38 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import AnySession, get_session, run_db
 from ..models.user import User
 from ..models.wage_settings import WageSettings
 from ..schemas.auth import LoginRequest, Token
 from ..schemas.user import UserCreate, UserOut
-from ..utils.security import hash_password, verify_password, create_access_token
+from ..services.password_service import PasswordHashingBusy, password_hasher
+from ..services.principal_cache import invalidate_principal
+from ..utils.security import create_access_token
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(data: UserCreate, db: Session = Depends(get_db)):
-    if not data.gdpr_accepted:
-        raise HTTPException(400, "Du må godta personvernerklæringen")
-    if db.query(User).filter(User.email == data.email).first():
-        raise HTTPException(400, "E-post er allerede registrert")
+async def _password_job(job):
+    try:
+        return await job
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serveren er opptatt, prøv igjen om litt",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _find_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, data: UserCreate, password_hash: str) -> User:
     user = User(
         email=data.email,
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         name=data.name,
         gdpr_accepted=True,
         is_verified=True,
@@ -30,15 +44,37 @@ def register(data: UserCreate, db: Session = Depends(get_db)):
     db.add(ws)
     db.commit()
     db.refresh(user)
+    # SQLite can reuse the id of a deleted user; drop anything cached under it.
+    invalidate_principal(user.id)
     return user
 
 
+@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+async def register(data: UserCreate, db: AnySession = Depends(get_session)):
+    if not data.gdpr_accepted:
+        raise HTTPException(400, "Du må godta personvernerklæringen")
+    if await run_db(db, _find_user, data.email):
+        raise HTTPException(400, "E-post er allerede registrert")
+    password_hash = await _password_job(password_hasher.hash(data.password))
+    return await run_db(db, _create_user, data, password_hash)
+
+
+def _store_hash(db: Session, user: User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+
+
 @router.post("/login", response_model=Token)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, user.password_hash):
+async def login(data: LoginRequest, db: AnySession = Depends(get_session)):
+    user = await run_db(db, _find_user, data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Feil e-post eller passord")
+    valid, new_hash = await _password_job(password_hasher.verify(data.password, user.password_hash))
+    if not valid:
         raise HTTPException(status_code=401, detail="Feil e-post eller passord")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Konto er deaktivert")
+    if new_hash:
+        await run_db(db, _store_hash, user, new_hash)
     token = create_access_token(user.id, user.is_admin)
     return Token(access_token=token, token_type="bearer", is_admin=user.is_admin)
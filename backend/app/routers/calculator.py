@@ -1,60 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models.user import User
+from ..database import AnySession, get_compute_session, get_session, run_db
 from ..models.shift import Shift
-from ..models.wage_settings import WageSettings
 from ..models.month_summary import MonthSummary
 from ..schemas.month_summary import MonthSummaryOut, MonthSummaryCreate
+from ..schemas.simulation import SimulationRequest
 from ..middleware.auth import get_current_user
-from ..services.wage_engine import calculate_month
+from ..middleware.etag import user_etag
+from ..services.principal_cache import Principal
+from ..services.wage_engine import calculate_month, calculate_period, simulate_month
+from ..services.rate_plan import RatePlan, load_rate_plan, plan_with_overrides
+from ..services.aggregate_service import month_from_aggregates
 from ..services.holiday_service import get_holidays_for_month
+from ..services.revision_service import MONTH_SUMMARY, bump_revision
+from ..utils.time_utils import month_range
 from typing import List
 
 router = APIRouter(prefix="/api/calculator", tags=["calculator"])
 
+_MONEY_KEYS = {"gross_pay", "tax_deduction", "net_pay", "holiday_pay_base", "holiday_pay_earned"}
 
-def _get_ws(user_id: int, db: Session) -> WageSettings:
-    ws = db.query(WageSettings).filter(WageSettings.user_id == user_id).first()
-    return ws or WageSettings(user_id=user_id)
 
+def _month_result(user_id: int, year: int, month: int, plan: RatePlan, db: Session) -> dict:
+    """Month totals from the aggregates, falling back to the shifts when they are stale."""
+    result = month_from_aggregates(db, user_id, year, month, plan)
+    if result is not None:
+        return result
+    shifts = _month_shifts(user_id, year, month, db)
+    return {"shifts_count": len(shifts), **calculate_month(shifts, plan)}
 
-@router.get("/month")
-def calculate(
+
+def _month_shifts(user_id: int, year: int, month: int, db: Session) -> list:
+    first, last = month_range(year, month)
+    return db.query(Shift.date, Shift.start_time, Shift.end_time, Shift.pause_min).filter(
+        Shift.user_id == user_id,
+        Shift.date.between(first, last)
+    ).all()
+
+
+def _month(db: Session, user_id: int, year: int, month: int) -> dict:
+    return {
+        "holidays": get_holidays_for_month(year, month),
+        **_month_result(user_id, year, month, load_rate_plan(user_id, db), db),
+    }
+
+
+@router.get("/month", dependencies=[Depends(user_etag())])
+async def calculate(
     year: int,
     month: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    ws = _get_ws(current_user.id, db)
-    prefix = f"{year}-{month:02d}"
-    shifts = db.query(Shift).filter(
-        Shift.user_id == current_user.id,
-        Shift.date.startswith(prefix)
-    ).all()
-    result = calculate_month(shifts, ws)
-    holidays = get_holidays_for_month(year, month)
-    return {"year": year, "month": month, "shifts_count": len(shifts), "holidays": holidays, **result}
+    return {"year": year, "month": month, **await run_db(db, _month, current_user.id, year, month)}
 
 
-@router.post("/month/save", response_model=MonthSummaryOut)
-def save_month(
-    data: MonthSummaryCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+def _period_result(user_id: int, start: date, end: date, plan: RatePlan, db: Session) -> dict:
+    # Read from the Monday of the first week so weekly overtime sees the whole week.
+    week_start = start - timedelta(days=start.weekday())
+    shifts = db.query(Shift.date, Shift.start_time, Shift.end_time, Shift.pause_min).filter(
+        Shift.user_id == user_id,
+        Shift.date.between(week_start, end),
+    ).order_by(Shift.date, Shift.start_time).yield_per(2000)
+    result = calculate_period(shifts, plan, start)
+    return {"from": start.isoformat(), "to": end.isoformat(), **result}
+
+
+def _period(db: Session, user_id: int, start: date, end: date) -> dict:
+    return _period_result(user_id, start, end, load_rate_plan(user_id, db), db)
+
+
+@router.get("/period", dependencies=[Depends(user_etag())])
+async def calculate_range(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    ws = _get_ws(current_user.id, db)
-    prefix = f"{data.year}-{data.month:02d}"
-    shifts = db.query(Shift).filter(
-        Shift.user_id == current_user.id,
-        Shift.date.startswith(prefix)
-    ).all()
-    result = calculate_month(shifts, ws)
+    """Totals for a date range with per-month and per-ISO-week breakdowns."""
+    if to_date < from_date:
+        raise HTTPException(400, "Ugyldig periode")
+    return await run_db(db, _period, current_user.id, from_date, to_date)
+
+
+@router.get("/year", dependencies=[Depends(user_etag(daily=True))])
+async def calculate_year(
+    year: int,
+    ytd: bool = Query(False),
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Annual statement; with ytd=true the period ends today."""
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    if ytd:
+        end = min(end, date.today())
+        if end < start:
+            raise HTTPException(400, "Ugyldig periode")
+    return {"year": year, **await run_db(db, _period, current_user.id, start, end)}
+
+
+def _simulate(db: Session, user_id: int, data: SimulationRequest) -> tuple:
+    plan = load_rate_plan(user_id, db)
+    try:
+        plans = [plan_with_overrides(plan, sc.settings.model_dump(exclude_unset=True)) for sc in data.scenarios]
+    except ValueError:
+        raise HTTPException(400, "Ugyldige innstillinger i scenario")
+    shifts = _month_shifts(user_id, data.year, data.month, db)
+    return len(shifts), simulate_month(shifts, [plan, *plans])
+
+
+@router.post("/simulate")
+async def simulate(
+    data: SimulationRequest,
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Month totals under the current settings and under each scenario's
+    overrides, with differences against the current settings. Nothing is saved.
+    """
+    shifts_count, (current, *results) = await run_db(db, _simulate, current_user.id, data)
+    return {
+        "year": data.year,
+        "month": data.month,
+        "shifts_count": shifts_count,
+        "current": current,
+        "scenarios": [
+            {
+                "name": sc.name or f"Scenario {i}",
+                **result,
+                "diff": {k: round(v - current[k], 2 if k in _MONEY_KEYS else 4) for k, v in result.items()},
+            }
+            for i, (sc, result) in enumerate(zip(data.scenarios, results), start=1)
+        ],
+    }
+
+
+def _save_month(db: Session, user_id: int, year: int, month: int) -> MonthSummary:
+    plan = load_rate_plan(user_id, db)
+    result = _month_result(user_id, year, month, plan, db)
+    result.pop("shifts_count")
 
     existing = db.query(MonthSummary).filter(
-        MonthSummary.user_id == current_user.id,
-        MonthSummary.year == data.year,
-        MonthSummary.month == data.month,
+        MonthSummary.user_id == user_id,
+        MonthSummary.year == year,
+        MonthSummary.month == month,
     ).first()
 
     if existing and existing.is_locked:
@@ -63,35 +154,56 @@ def save_month(
     if existing:
         for k, v in result.items():
             setattr(existing, k, v)
+        bump_revision(db, user_id, upserted={MONTH_SUMMARY: [existing.id]})
         db.commit()
         db.refresh(existing)
         return existing
 
     summary = MonthSummary(
-        user_id=current_user.id,
-        year=data.year,
-        month=data.month,
+        user_id=user_id,
+        year=year,
+        month=month,
         **result,
     )
     db.add(summary)
+    db.flush()
+    bump_revision(db, user_id, upserted={MONTH_SUMMARY: [summary.id]})
     db.commit()
     db.refresh(summary)
     return summary
 
 
-@router.get("/summaries", response_model=List[MonthSummaryOut])
-def list_summaries(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(MonthSummary).filter(MonthSummary.user_id == current_user.id).order_by(
+@router.post("/month/save", response_model=MonthSummaryOut)
+async def save_month(
+    data: MonthSummaryCreate,
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    return await run_db(db, _save_month, current_user.id, data.year, data.month)
+
+
+def _summaries(db: Session, user_id: int) -> List[MonthSummary]:
+    return db.query(MonthSummary).filter(MonthSummary.user_id == user_id).order_by(
         MonthSummary.year.desc(), MonthSummary.month.desc()
     ).all()
 
 
-@router.post("/summaries/{summary_id}/lock", response_model=MonthSummaryOut)
-def lock_summary(summary_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    s = db.query(MonthSummary).filter(MonthSummary.id == summary_id, MonthSummary.user_id == current_user.id).first()
+@router.get("/summaries", response_model=List[MonthSummaryOut], dependencies=[Depends(user_etag())])
+async def list_summaries(db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, _summaries, current_user.id)
+
+
+def _lock(db: Session, user_id: int, summary_id: int) -> MonthSummary:
+    s = db.query(MonthSummary).filter(MonthSummary.id == summary_id, MonthSummary.user_id == user_id).first()
     if not s:
         raise HTTPException(404, "Sammendrag ikke funnet")
     s.is_locked = True
+    bump_revision(db, user_id, upserted={MONTH_SUMMARY: [s.id]})
     db.commit()
     db.refresh(s)
     return s
+
+
+@router.post("/summaries/{summary_id}/lock", response_model=MonthSummaryOut)
+async def lock_summary(summary_id: int, db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, _lock, current_user.id, summary_id)
@@ -0,0 +1,75 @@
+"""
+Everything the calendar grid shows for a date range in one call.
+
+A month view spans parts of up to three months. GET /api/calendar returns
+the range's shifts from one query on the (user_id, date) index, their hour
+and pay sums per day, and holiday flags and names from the holiday index.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..database import AnySession, get_session, run_db
+from ..middleware.auth import get_current_user
+from ..middleware.etag import user_etag
+from ..models.shift import Shift
+from ..schemas.calendar import CALENDAR_MAX_DAYS, CalendarOut
+from ..schemas.shift import ShiftOut
+from ..services.holiday_service import holiday_index
+from ..services.principal_cache import Principal
+
+router = APIRouter(prefix="/api/calendar", tags=["calendar"])
+
+_SHIFT_COLUMNS = [getattr(Shift, name) for name in ShiftOut.model_fields]
+
+
+def _calendar(db: Session, user_id: int, first: date, last: date) -> Dict:
+    q = select(*_SHIFT_COLUMNS).where(
+        Shift.user_id == user_id, Shift.date.between(first, last),
+    ).order_by(Shift.date, Shift.start_time, Shift.id)
+    shifts = [dict(row) for row in db.execute(q).mappings()]
+
+    holidays = dict(holiday_index.between(first, last))
+    days: List[Dict] = []
+    by_date: Dict[date, Dict] = {}
+    for offset in range((last - first).days + 1):
+        day = first + timedelta(days=offset)
+        by_date[day] = {
+            "date": day, "holiday": day in holidays, "holiday_name": holidays.get(day),
+            "shifts_count": 0, "total_hours": 0.0, "gross_pay": 0.0,
+        }
+        days.append(by_date[day])
+    for shift in shifts:
+        totals = by_date[shift["date"]]
+        totals["shifts_count"] += 1
+        totals["total_hours"] += shift["total_hours"] or 0
+        totals["gross_pay"] += shift["gross_pay"] or 0
+    for totals in days:
+        totals["total_hours"] = round(totals["total_hours"], 2)
+        totals["gross_pay"] = round(totals["gross_pay"], 2)
+
+    return {
+        "from_date": first,
+        "to_date": last,
+        "total_hours": round(sum(s["total_hours"] or 0 for s in shifts), 2),
+        "gross_pay": round(sum(s["gross_pay"] or 0 for s in shifts), 2),
+        "days": days,
+        "shifts": shifts,
+    }
+
+
+@router.get("", response_model=CalendarOut, dependencies=[Depends(user_etag())])
+async def calendar(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: AnySession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Shifts, per-day totals and holidays for [from, to]; at most CALENDAR_MAX_DAYS days."""
+    if to_date < from_date or (to_date - from_date).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(400, "Ugyldig periode")
+    return await run_db(db, _calendar, current_user.id, from_date, to_date)
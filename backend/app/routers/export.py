@@ -3,20 +3,22 @@ from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..database import get_db
-from ..models.user import User
 from ..models.shift import Shift
 from ..models.month_summary import MonthSummary
 from ..middleware.auth import get_current_user
+from ..middleware.etag import etag_headers, user_etag
+from ..services.principal_cache import Principal
+from ..utils.time_utils import month_range
 from ..services.export_service import generate_csv, generate_excel, generate_pdf
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
 
 def _get_shifts(user_id: int, year: int, month: int, db: Session):
-    prefix = f"{year}-{month:02d}"
+    first, last = month_range(year, month)
     return db.query(Shift).filter(
         Shift.user_id == user_id,
-        Shift.date.startswith(prefix)
+        Shift.date.between(first, last)
     ).order_by(Shift.date, Shift.start_time).all()
 
 
@@ -33,7 +35,8 @@ def export_csv(
     year: int = Query(...),
     month: int = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    etag: str = Depends(user_etag()),
 ):
     shifts = _get_shifts(current_user.id, year, month, db)
     data = generate_csv(shifts, current_user)
@@ -41,7 +44,7 @@ def export_csv(
     return Response(
         content=data,
         media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag_headers(etag)},
     )
 
 
@@ -50,7 +53,8 @@ def export_excel(
     year: int = Query(...),
     month: int = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    etag: str = Depends(user_etag()),
 ):
     shifts = _get_shifts(current_user.id, year, month, db)
     summary = _get_summary(current_user.id, year, month, db)
@@ -59,7 +63,7 @@ def export_excel(
     return Response(
         content=data,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag_headers(etag)},
     )
 
 
@@ -68,7 +72,8 @@ def export_pdf(
     year: int = Query(...),
     month: int = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    etag: str = Depends(user_etag()),
 ):
     shifts = _get_shifts(current_user.id, year, month, db)
     summary = _get_summary(current_user.id, year, month, db)
@@ -77,5 +82,5 @@ def export_pdf(
     return Response(
         content=data,
         media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag_headers(etag)},
     )
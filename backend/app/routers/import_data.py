@@ -2,26 +2,24 @@ from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from ..database import get_db
-from ..models.user import User
 from ..models.shift import Shift
-from ..models.wage_settings import WageSettings
 from ..middleware.auth import get_current_user
+from ..services.principal_cache import Principal
 from ..services.import_service import parse_excel, parse_csv
-from ..services.wage_engine import calculate_shift
+from ..services.wage_engine import calculate_shifts_batch
+from ..services.rate_plan import load_rate_plan
+from ..services.aggregate_service import add_shifts
+from ..services.revision_service import SHIFT, bump_revision
+from ..utils.parsing import parse_date
 
 router = APIRouter(prefix="/api/import", tags=["import"])
 
 
-def _get_ws(user_id: int, db: Session) -> WageSettings:
-    ws = db.query(WageSettings).filter(WageSettings.user_id == user_id).first()
-    return ws or WageSettings(user_id=user_id)
-
-
 @router.post("/preview")
 async def preview_import(
     file: UploadFile = File(...),
     name_filter: Optional[str] = Form(None),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     content = await file.read()
     fname = file.filename.lower()
@@ -39,7 +37,7 @@ async def confirm_import(
     file: UploadFile = File(...),
     name_filter: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     content = await file.read()
     fname = file.filename.lower()
@@ -50,14 +48,14 @@ async def confirm_import(
     else:
         raise HTTPException(400, "Støttet filformat: .xlsx, .csv")
 
-    ws = _get_ws(current_user.id, db)
-    created = 0
-    for sd in shifts_data:
-        shift = Shift(user_id=current_user.id, **sd)
-        result = calculate_shift(shift, ws)
+    plan = load_rate_plan(current_user.id, db)
+    shifts = [Shift(user_id=current_user.id, **{**sd, "date": parse_date(sd["date"])}) for sd in shifts_data]
+    for shift, result in zip(shifts, calculate_shifts_batch(shifts, plan)):
         for k, v in result.items():
             setattr(shift, k, v)
-        db.add(shift)
-        created += 1
+    db.add_all(shifts)
+    add_shifts(db, current_user.id, shifts, plan)
+    db.flush()
+    bump_revision(db, current_user.id, upserted={SHIFT: [s.id for s in shifts]})
     db.commit()
-    return {"imported": created, "errors": errors}
+    return {"imported": len(shifts), "errors": errors}
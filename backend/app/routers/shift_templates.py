@@ -2,16 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
-from ..models.user import User
 from ..models.shift_template import ShiftTemplate
 from ..schemas.shift_template import ShiftTemplateCreate, ShiftTemplateUpdate, ShiftTemplateOut
 from ..middleware.auth import get_current_user
+from ..middleware.etag import user_etag
+from ..services.principal_cache import Principal
+from ..services.revision_service import SHIFT_TEMPLATE, bump_revision
 
 router = APIRouter(prefix="/api/shift-templates", tags=["shift-templates"])
 
 
-@router.get("", response_model=List[ShiftTemplateOut])
-def list_templates(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("", response_model=List[ShiftTemplateOut], dependencies=[Depends(user_etag())])
+def list_templates(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     return db.query(ShiftTemplate).filter(ShiftTemplate.user_id == current_user.id).all()
 
 
@@ -19,10 +21,12 @@ def list_templates(db: Session = Depends(get_db), current_user: User = Depends(g
 def create_template(
     data: ShiftTemplateCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     t = ShiftTemplate(user_id=current_user.id, **data.model_dump())
     db.add(t)
+    db.flush()
+    bump_revision(db, current_user.id, upserted={SHIFT_TEMPLATE: [t.id]})
     db.commit()
     db.refresh(t)
     return t
@@ -33,13 +37,14 @@ def update_template(
     template_id: int,
     data: ShiftTemplateUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     t = db.query(ShiftTemplate).filter(ShiftTemplate.id == template_id, ShiftTemplate.user_id == current_user.id).first()
     if not t:
         raise HTTPException(404, "Vaktkode ikke funnet")
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(t, field, value)
+    bump_revision(db, current_user.id, upserted={SHIFT_TEMPLATE: [t.id]})
     db.commit()
     db.refresh(t)
     return t
@@ -49,11 +54,12 @@ def update_template(
 def delete_template(
     template_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     t = db.query(ShiftTemplate).filter(ShiftTemplate.id == template_id, ShiftTemplate.user_id == current_user.id).first()
     if not t:
         raise HTTPException(404, "Vaktkode ikke funnet")
     db.delete(t)
+    bump_revision(db, current_user.id, deleted={SHIFT_TEMPLATE: [t.id]})
     db.commit()
     return {"detail": "Slettet"}
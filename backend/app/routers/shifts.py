@@ -1,97 +1,220 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import base64
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
-from ..models.user import User
+from pydantic import TypeAdapter
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..database import AnySession, get_compute_session, get_session, run_db
 from ..models.shift import Shift
 from ..models.shift_template import ShiftTemplate
-from ..models.wage_settings import WageSettings
-from ..schemas.shift import ShiftCreate, ShiftUpdate, ShiftOut
+from ..schemas.shift import ROTA_MAX_DAYS, RotaRequest, ShiftBulkRequest, ShiftBulkResult, ShiftCreate, ShiftUpdate, ShiftOut
 from ..middleware.auth import get_current_user
+from ..middleware.etag import etag_headers, user_etag
+from ..services.principal_cache import Principal
 from ..services.wage_engine import calculate_shift
+from ..services.rate_plan import RatePlan, load_rate_plan
+from ..services.aggregate_service import add_shifts, remove_shifts
+from ..services.revision_service import SHIFT, bump_revision, record_changes
+from ..services.shift_service import RotaError, apply_bulk, generate_rota
+from ..utils.time_utils import month_range
 
 router = APIRouter(prefix="/api/shifts", tags=["shifts"])
 
 
-def _get_ws(user_id: int, db: Session) -> WageSettings:
-    ws = db.query(WageSettings).filter(WageSettings.user_id == user_id).first()
-    return ws or WageSettings(user_id=user_id)
-
-
-def _recalculate(shift: Shift, ws: WageSettings):
-    result = calculate_shift(shift, ws)
+def _recalculate(shift: Shift, plan: RatePlan):
+    result = calculate_shift(shift, plan)
     for k, v in result.items():
         setattr(shift, k, v)
 
 
-@router.get("", response_model=List[ShiftOut])
-def list_shifts(
-    year: Optional[int] = None,
-    month: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    q = db.query(Shift).filter(Shift.user_id == current_user.id)
+# Columns a listing can be projected to with ?fields=.
+_FIELDS = {name: getattr(Shift, name) for name in ShiftOut.model_fields}
+_CURSOR_FIELDS = ("date", "start_time", "id")
+# Serialises column rows in pydantic-core, which is several times faster
+# than FastAPI's jsonable_encoder for plain dicts.
+_ROWS = TypeAdapter(List[Dict[str, Any]])
+
+
+def _encode_cursor(row) -> str:
+    token = f"{row['date'].isoformat()}|{row['start_time']}|{row['id']}"
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, str, int]:
+    try:
+        token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, start_time, shift_id = token.split("|")
+        return date.fromisoformat(day), start_time, int(shift_id)
+    except ValueError:
+        raise HTTPException(400, "Ugyldig markør")
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in _FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Ukjent felt: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def _list(
+    db: Session,
+    user_id: int,
+    year: Optional[int],
+    month: Optional[int],
+    fields: List[str],
+    after: Optional[Tuple[date, str, int]] = None,
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """Column rows (no ORM objects) in (date, start_time, id) order, after the cursor key."""
+    columns = list(dict.fromkeys([*fields, *_CURSOR_FIELDS])) if limit else fields
+    q = select(*(_FIELDS[f] for f in columns)).where(Shift.user_id == user_id)
     if year and month:
-        prefix = f"{year}-{month:02d}"
-        q = q.filter(Shift.date.startswith(prefix))
+        q = q.where(Shift.date.between(*month_range(year, month)))
     elif year:
-        q = q.filter(Shift.date.startswith(str(year)))
-    return q.order_by(Shift.date, Shift.start_time).all()
+        q = q.where(Shift.date.between(date(year, 1, 1), date(year, 12, 31)))
+    if after:
+        q = q.where(tuple_(Shift.date, Shift.start_time, Shift.id) > after)
+    q = q.order_by(Shift.date, Shift.start_time, Shift.id)
+    if limit:
+        q = q.limit(limit + 1)      # one extra row tells whether there is a next page
+    return [dict(row) for row in db.execute(q).mappings()]
 
 
-@router.post("", response_model=ShiftOut, status_code=201)
-def create_shift(
-    data: ShiftCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+@router.get("", responses={200: {"model": List[ShiftOut]}})
+async def list_shifts(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.SHIFT_PAGE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Kommaseparerte felt, f.eks. id,date,start_time"),
+    db: AnySession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+    etag: str = Depends(user_etag()),
 ):
-    ws = _get_ws(current_user.id, db)
-    shift = Shift(user_id=current_user.id, **data.model_dump())
+    """
+    Shifts in date order. With limit, one page at a time: the X-Next-Cursor
+    header holds the cursor for the next page and is absent on the last one.
+    """
+    names = _parse_fields(fields)
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await run_db(db, _list, current_user.id, year, month, names, after, limit)
+    headers = etag_headers(etag)
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    if rows and rows[0].keys() - set(names):       # cursor columns not asked for
+        rows = [{f: row[f] for f in names} for row in rows]
+    return Response(_ROWS.dump_json(rows), media_type="application/json", headers=headers)
+
+
+def _create(db: Session, user_id: int, data: ShiftCreate) -> Shift:
+    plan = load_rate_plan(user_id, db)
+    shift = Shift(user_id=user_id, **data.model_dump())
     # If template supplied, apply defaults for pause if not set
     if data.template_id:
         tpl = db.query(ShiftTemplate).filter(ShiftTemplate.id == data.template_id).first()
         if tpl and shift.pause_min == 0:
             shift.pause_min = tpl.pause_min
-    _recalculate(shift, ws)
+    _recalculate(shift, plan)
     db.add(shift)
+    add_shifts(db, user_id, [shift], plan)
+    db.flush()
+    bump_revision(db, user_id, upserted={SHIFT: [shift.id]})
     db.commit()
     db.refresh(shift)
     return shift
 
 
-@router.get("/{shift_id}", response_model=ShiftOut)
-def get_shift(shift_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.user_id == current_user.id).first()
-    if not shift:
-        raise HTTPException(404, "Vakt ikke funnet")
-    return shift
+@router.post("", response_model=ShiftOut, status_code=201)
+async def create_shift(
+    data: ShiftCreate,
+    db: AnySession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    return await run_db(db, _create, current_user.id, data)
 
 
-@router.patch("/{shift_id}", response_model=ShiftOut)
-def update_shift(
-    shift_id: int,
-    data: ShiftUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+@router.post("/bulk", response_model=ShiftBulkResult)
+async def bulk_shifts(
+    data: ShiftBulkRequest,
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.user_id == current_user.id).first()
+    """Creates, updates and deletes in one transaction, with a result per item."""
+    return await run_db(db, apply_bulk, current_user.id, data)
+
+
+@router.post("/rota")
+async def create_rota(
+    data: RotaRequest,
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Expand a repeating pattern of template codes over [from_date, to_date]
+    and save the shifts in one transaction (nothing is saved with dry_run).
+    """
+    if data.to_date < data.from_date or (data.to_date - data.from_date).days >= ROTA_MAX_DAYS:
+        raise HTTPException(400, "Ugyldig periode")
+    try:
+        return await run_db(db, generate_rota, current_user.id, data)
+    except RotaError as e:
+        raise HTTPException(400, str(e))
+
+
+def _get(db: Session, user_id: int, shift_id: int) -> Shift:
+    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.user_id == user_id).first()
     if not shift:
         raise HTTPException(404, "Vakt ikke funnet")
-    ws = _get_ws(current_user.id, db)
+    return shift
+
+
+@router.get("/{shift_id}", response_model=ShiftOut, dependencies=[Depends(user_etag())])
+async def get_shift(shift_id: int, db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, _get, current_user.id, shift_id)
+
+
+def _update(db: Session, user_id: int, shift_id: int, data: ShiftUpdate) -> Shift:
+    # Bump before reading, so the shift cannot change until the commit.
+    revision = bump_revision(db, user_id)
+    shift = _get(db, user_id, shift_id)
+    plan = load_rate_plan(user_id, db)
+    remove_shifts(db, user_id, [shift])
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(shift, field, value)
-    _recalculate(shift, ws)
+    _recalculate(shift, plan)
+    add_shifts(db, user_id, [shift], plan)
+    record_changes(db, user_id, revision, upserted={SHIFT: [shift.id]})
     db.commit()
     db.refresh(shift)
     return shift
 
 
-@router.delete("/{shift_id}")
-def delete_shift(shift_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.user_id == current_user.id).first()
-    if not shift:
-        raise HTTPException(404, "Vakt ikke funnet")
+@router.patch("/{shift_id}", response_model=ShiftOut)
+async def update_shift(
+    shift_id: int,
+    data: ShiftUpdate,
+    db: AnySession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    return await run_db(db, _update, current_user.id, shift_id, data)
+
+
+def _delete(db: Session, user_id: int, shift_id: int):
+    revision = bump_revision(db, user_id)
+    shift = _get(db, user_id, shift_id)
+    remove_shifts(db, user_id, [shift])
     db.delete(shift)
+    record_changes(db, user_id, revision, deleted={SHIFT: [shift.id]})
     db.commit()
+
+
+@router.delete("/{shift_id}")
+async def delete_shift(shift_id: int, db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    await run_db(db, _delete, current_user.id, shift_id)
     return {"detail": "Slettet"}
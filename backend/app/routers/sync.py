@@ -0,0 +1,122 @@
+"""
+Delta sync for offline-first clients.
+
+GET /api/sync?since=<cursor> returns the user's shifts, shift templates,
+wage settings and month summaries written after the cursor, plus the ids
+deleted since then, and a new cursor. The cursor is the user's data
+revision (revision_service). since=0, or a cursor the server does not know,
+returns a full snapshot with reset=true.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import AnySession, get_compute_session, run_db
+from ..middleware.auth import get_current_user
+from ..middleware.etag import user_etag
+from ..models.month_summary import MonthSummary
+from ..models.shift import Shift
+from ..models.shift_template import ShiftTemplate
+from ..models.sync_change import SyncChange
+from ..models.wage_settings import WageSettings
+from ..schemas.shift import ShiftOut
+from ..schemas.sync import SyncOut
+from ..services.principal_cache import Principal
+from ..services.revision_service import MONTH_SUMMARY, SHIFT, SHIFT_TEMPLATE, WAGE_SETTINGS, current_revision
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+_SHIFT_COLUMNS = [getattr(Shift, name) for name in ShiftOut.model_fields]
+_IN_CHUNK = 1000
+
+
+def _by_ids(query_for, ids: Optional[Iterable[int]]) -> list:
+    """query_for(filter) results, for all rows (ids=None) or the given ids in chunks."""
+    if ids is None:
+        return query_for(None)
+    ids = sorted(ids)
+    rows = []
+    for i in range(0, len(ids), _IN_CHUNK):
+        rows += query_for(ids[i:i + _IN_CHUNK])
+    return rows
+
+
+def _load(db: Session, user_id: int, ids: Optional[Dict[str, set]] = None) -> Dict:
+    """Current rows of the user's synced entities: all of them, or only `ids` per entity."""
+
+    def wanted(entity: str):
+        return None if ids is None else ids.get(entity, ())
+
+    def shifts(chunk):
+        q = select(*_SHIFT_COLUMNS).where(Shift.user_id == user_id)
+        if chunk is not None:
+            q = q.where(Shift.id.in_(chunk))
+        return [dict(row) for row in db.execute(q.order_by(Shift.id)).mappings()]
+
+    def rows_of(model):
+        def query_for(chunk):
+            q = db.query(model).filter(model.user_id == user_id)
+            if chunk is not None:
+                q = q.filter(model.id.in_(chunk))
+            return q.order_by(model.id).all()
+        return query_for
+
+    wage_settings = None
+    if ids is None or WAGE_SETTINGS in ids:
+        wage_settings = db.query(WageSettings).filter(WageSettings.user_id == user_id).first()
+    return {
+        "shifts": _by_ids(shifts, wanted(SHIFT)),
+        "shift_templates": _by_ids(rows_of(ShiftTemplate), wanted(SHIFT_TEMPLATE)),
+        "wage_settings": wage_settings,
+        "month_summaries": _by_ids(rows_of(MonthSummary), wanted(MONTH_SUMMARY)),
+    }
+
+
+def _sync(db: Session, user_id: int, since: int, limit: int) -> Dict:
+    # The revision is read before the data, so anything written in between
+    # is sent again next time rather than skipped.
+    revision = current_revision(db, user_id)
+    if since <= 0 or since > revision:
+        return {"cursor": revision, "more": False, "reset": True, **_load(db, user_id), "deleted": {}}
+
+    q = db.query(SyncChange.entity, SyncChange.entity_id, SyncChange.revision, SyncChange.deleted).filter(
+        SyncChange.user_id == user_id, SyncChange.revision > since,
+    ).order_by(SyncChange.revision, SyncChange.id)
+    changes = q.limit(limit + 1).all()
+    more = len(changes) > limit
+    if more:
+        # Pages end on a revision boundary, so the cursor never splits a write.
+        cut = changes[limit].revision
+        changes = [c for c in changes if c.revision < cut]
+        if not changes:
+            changes = q.filter(SyncChange.revision == cut).all()
+
+    upserted: Dict[str, set] = {}
+    deleted: Dict[str, List[int]] = {}
+    for c in changes:
+        if c.deleted:
+            deleted.setdefault(c.entity, []).append(c.entity_id)
+        else:
+            upserted.setdefault(c.entity, set()).add(c.entity_id)
+    return {
+        "cursor": changes[-1].revision if changes else since,
+        "more": more,
+        "reset": False,
+        **_load(db, user_id, upserted),
+        "deleted": deleted,
+    }
+
+
+@router.get("", response_model=SyncOut, dependencies=[Depends(user_etag())])
+async def sync(
+    since: int = Query(0, ge=0),
+    limit: int = Query(settings.SYNC_PAGE_MAX, ge=1, le=settings.SYNC_PAGE_MAX),
+    db: AnySession = Depends(get_compute_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Changes since the cursor; with more=true, call again with the new cursor."""
+    return await run_db(db, _sync, current_user.id, since, limit)
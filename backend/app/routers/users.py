@@ -1,30 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import AnySession, get_session, run_db
 from ..models.user import User
 from ..schemas.user import UserOut, UserUpdate
 from ..middleware.auth import get_current_user
+from ..middleware.etag import user_etag
+from ..services.principal_cache import Principal, invalidate_principal
+from ..services.revision_service import bump_generation, bump_revision
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 
-@router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+def _get_user(db: Session, user_id: int) -> User:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(404, "Bruker ikke funnet")
+    return user
+
+
+@router.get("/me", response_model=UserOut, dependencies=[Depends(user_etag())])
+async def get_me(db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, _get_user, current_user.id)
+
+
+def _update(db: Session, user_id: int, changes: dict) -> User:
+    user = _get_user(db, user_id)
+    for field, value in changes.items():
+        setattr(user, field, value)
+    bump_revision(db, user_id)
+    db.commit()
+    db.refresh(user)
+    invalidate_principal(user_id)
+    return user
 
 
 @router.patch("/me", response_model=UserOut)
-def update_me(data: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(current_user, field, value)
+async def update_me(data: UserUpdate, db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, _update, current_user.id, data.model_dump(exclude_unset=True))
+
+
+def _delete(db: Session, user_id: int):
+    db.delete(_get_user(db, user_id))
+    bump_generation(db)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    invalidate_principal(user_id)
 
 
 @router.delete("/me")
-def delete_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_me(db: AnySession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
     """GDPR: delete own account and all associated data."""
-    db.delete(current_user)
-    db.commit()
+    await run_db(db, _delete, current_user.id)
     return {"detail": "Konto og alle data er slettet"}
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..models.user import User
 from ..models.wage_settings import WageSettings
 from ..schemas.wage_settings import WageSettingsOut, WageSettingsUpdate
 from ..middleware.auth import get_current_user
+from ..middleware.etag import user_etag
+from ..services.principal_cache import Principal
+from ..services.rate_plan import get_rate_plan, invalidate_rate_plan
+from ..services.revision_service import WAGE_SETTINGS, bump_revision
+from ..services import recalc_service
 
 router = APIRouter(prefix="/api/wage-settings", tags=["wage-settings"])
 
@@ -19,20 +23,37 @@ def _get_or_create_ws(user_id: int, db: Session) -> WageSettings:
     return ws
 
 
-@router.get("", response_model=WageSettingsOut)
-def get_settings(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("", response_model=WageSettingsOut, dependencies=[Depends(user_etag())])
+def get_settings(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     return _get_or_create_ws(current_user.id, db)
 
 
 @router.patch("", response_model=WageSettingsOut)
 def update_settings(
     data: WageSettingsUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     ws = _get_or_create_ws(current_user.id, db)
+    old_version = get_rate_plan(ws).version
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(ws, field, value)
+    bump_revision(db, current_user.id, upserted={WAGE_SETTINGS: [ws.id]})
     db.commit()
+    invalidate_rate_plan(current_user.id)
     db.refresh(ws)
+    if get_rate_plan(ws).version != old_version:
+        # Stored shifts were calculated with the old settings
+        job = recalc_service.start_job(current_user.id)
+        background_tasks.add_task(recalc_service.run_job, job.id)
     return ws
+
+
+@router.get("/recalculation")
+def recalculation_status(current_user: Principal = Depends(get_current_user)):
+    """Progress of the latest background recalculation of the user's shifts."""
+    job = recalc_service.latest_job(current_user.id)
+    if not job:
+        raise HTTPException(404, "Ingen omberegning funnet")
+    return job.to_dict()
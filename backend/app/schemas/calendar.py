@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import List, Optional
+import datetime as dt
+from .shift import ShiftOut
+
+CALENDAR_MAX_DAYS = 366
+
+
+class CalendarDay(BaseModel):
+    date: dt.date
+    holiday: bool
+    holiday_name: Optional[str]
+    shifts_count: int
+    total_hours: float      # shifts are counted on their start date
+    gross_pay: float
+
+
+class CalendarOut(BaseModel):
+    from_date: dt.date
+    to_date: dt.date
+    total_hours: float
+    gross_pay: float
+    days: List[CalendarDay]     # every day of the range, in order
+    shifts: List[ShiftOut]
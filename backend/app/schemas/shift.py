@@ -1,10 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import datetime as dt
 
 
 class ShiftCreate(BaseModel):
-    date: str               # YYYY-MM-DD
+    date: dt.date           # YYYY-MM-DD
     start_time: str         # HH:MM
     end_time: str           # HH:MM
     pause_min: int = 0
@@ -13,7 +13,7 @@ class ShiftCreate(BaseModel):
 
 
 class ShiftUpdate(BaseModel):
-    date: Optional[str] = None
+    date: Optional[dt.date] = None
     start_time: Optional[str] = None
     end_time: Optional[str] = None
     pause_min: Optional[int] = None
@@ -25,7 +25,7 @@ class ShiftOut(BaseModel):
     id: int
     user_id: int
     template_id: Optional[int]
-    date: str
+    date: dt.date
     start_time: str
     end_time: str
     pause_min: int
@@ -40,7 +40,54 @@ class ShiftOut(BaseModel):
     overtime_100_hours: float
     gross_pay: float
     is_holiday: bool
-    created_at: datetime
+    created_at: dt.datetime
 
     class Config:
         from_attributes = True
+
+
+# At most this many items per list in one bulk request.
+BULK_MAX_ITEMS = 1000
+
+
+class ShiftBulkUpdate(ShiftUpdate):
+    id: int
+
+
+class ShiftBulkRequest(BaseModel):
+    create: List[ShiftCreate] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    update: List[ShiftBulkUpdate] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    delete: List[int] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+
+
+class ShiftBulkItem(BaseModel):
+    op: Literal["create", "update", "delete"]
+    index: int                  # position in the request list
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+    shift: Optional[ShiftOut] = None
+
+
+class ShiftBulkResult(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[ShiftBulkItem]
+
+
+# Longest rota cycle and longest period one rota request may fill, in days.
+ROTA_MAX_CYCLE_DAYS = 366
+ROTA_MAX_DAYS = 2 * 366
+
+
+class RotaRequest(BaseModel):
+    # One template code per day of the cycle; null or "" is a day off.
+    pattern: List[Optional[str]] = Field(..., min_length=1, max_length=ROTA_MAX_CYCLE_DAYS)
+    from_date: dt.date
+    to_date: dt.date
+    cycle_start: Optional[dt.date] = None   # day of pattern[0]; defaults to from_date
+    holidays: Literal["flag", "skip"] = "flag"
+    skip_existing: bool = True              # leave days that already have a shift
+    dry_run: bool = False
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from .wage_settings import WageSettingsUpdate
+
+
+class SimulationScenario(BaseModel):
+    name: Optional[str] = None
+    settings: WageSettingsUpdate
+
+
+class SimulationRequest(BaseModel):
+    year: int
+    month: int = Field(..., ge=1, le=12)
+    scenarios: List[SimulationScenario] = Field(..., min_length=1, max_length=20)
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from .month_summary import MonthSummaryOut
+from .shift import ShiftOut
+from .shift_template import ShiftTemplateOut
+from .wage_settings import WageSettingsOut
+
+
+class SyncDeleted(BaseModel):
+    shift: List[int] = Field(default_factory=list)
+    shift_template: List[int] = Field(default_factory=list)
+    month_summary: List[int] = Field(default_factory=list)
+
+
+class SyncOut(BaseModel):
+    cursor: int             # pass as ?since= on the next call
+    more: bool              # more changes after this page; call again at once
+    reset: bool             # full snapshot (since=0 or unknown cursor): replace the local replica
+    shifts: List[ShiftOut]
+    shift_templates: List[ShiftTemplateOut]
+    wage_settings: Optional[WageSettingsOut]
+    month_summaries: List[MonthSummaryOut]
+    deleted: SyncDeleted
@@ -0,0 +1,328 @@
+"""
+Incrementally maintained month and ISO-week aggregates.
+
+Every write to a shift applies a delta (the shift's stored values, signed)
+to its MonthAggregate and WeekAggregate rows inside the caller's
+transaction, so the calculator can answer a month in O(weeks) instead of
+re-reading and re-calculating every shift.
+
+`check_aggregates` rebuilds the expected rows from the stored shifts and
+reports (and optionally repairs) any drift.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Numeric, bindparam, case, cast, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from ..database import upsert_insert
+from ..models.shift import Shift
+from ..models.shift_aggregate import MonthAggregate, WeekAggregate
+from ..utils.parsing import decode_date
+from ..utils.time_utils import month_range
+from .rate_plan import RatePlan
+from .revision_service import bump_revisions
+from .wage_engine import MONTH_SUM_KEYS, month_totals
+
+# Sums are kept at the precision the engine rounds shift values to, so
+# repeated add/subtract cycles do not accumulate float noise.
+_PRECISION = 4
+_TOLERANCE = {"gross_pay": 0.01}
+_DEFAULT_TOLERANCE = 0.001
+
+MonthKey = Tuple[int, int]                  # (year, month)
+WeekKey = Tuple[int, int, int, int]         # (year, month, iso_year, iso_week)
+
+
+def snapshot(shift: Shift) -> Dict:
+    """The parts of a shift the aggregates depend on, taken before an update."""
+    return {"date": shift.date, **{k: getattr(shift, k) or 0.0 for k in MONTH_SUM_KEYS}}
+
+
+def _keys(shift_date: str) -> Tuple[MonthKey, WeekKey]:
+    d = decode_date(shift_date)
+    return (d.year, d.month), (d.year, d.month, d.iso_year, d.iso_week)
+
+
+def _empty_sums() -> Dict[str, float]:
+    return {"shift_count": 0, **{k: 0.0 for k in MONTH_SUM_KEYS}}
+
+
+def _sum_rows(rows: Iterable, months: Dict, weeks: Dict, key_prefix: Tuple = ()):
+    """Accumulate shift values into month and week buckets."""
+    for row in rows:
+        values = row if isinstance(row, dict) else snapshot(row)
+        mkey, wkey = _keys(values["date"])
+        m = months.setdefault(key_prefix + mkey, _empty_sums())
+        m["shift_count"] += 1
+        for k in MONTH_SUM_KEYS:
+            m[k] += values[k] or 0.0
+        w = weeks.setdefault(key_prefix + wkey, [0, 0.0])
+        w[0] += 1
+        w[1] += values["total_hours"] or 0.0
+
+
+def _seed_months(db: Session, user_id: int, months: Iterable[MonthKey]):
+    """
+    Create the aggregate rows of months from the shifts already stored.
+
+    Shifts written before aggregates existed were calculated under unknown
+    settings, so a seeded non-empty month has no settings version. Must run
+    before the caller's pending shift changes are flushed.
+
+    Rows are inserted with ON CONFLICT DO NOTHING: when a concurrent request
+    seeded the month first, its row already holds every committed shift, and
+    the caller's delta is then applied on top of it.
+    """
+    months = set(months)
+    with db.no_autoflush:
+        stored = db.query(Shift.date, *(getattr(Shift, k) for k in MONTH_SUM_KEYS)).filter(
+            Shift.user_id == user_id,
+            or_(*(Shift.date.between(*month_range(year, month)) for year, month in months)),
+        ).all()
+    sums: Dict = {}
+    weeks: Dict = {}
+    _sum_rows(stored, sums, weeks)
+    month_rows = [
+        {"user_id": user_id, "year": year, "month": month, "settings_version": None,
+         **{k: round(v, _PRECISION) for k, v in sums.get((year, month), _empty_sums()).items()}}
+        for year, month in months
+    ]
+    db.execute(upsert_insert(db, MonthAggregate).values(month_rows).on_conflict_do_nothing())
+    week_rows = [
+        {"user_id": user_id, "year": y, "month": m, "iso_year": iso_year, "iso_week": iso_week,
+         "shift_count": count, "total_hours": round(hours, _PRECISION)}
+        for (y, m, iso_year, iso_week), (count, hours) in weeks.items()
+    ]
+    if week_rows:
+        db.execute(upsert_insert(db, WeekAggregate).values(week_rows).on_conflict_do_nothing())
+
+
+def _added(column, delta):
+    """column + delta, rounded to the stored precision, evaluated by the database."""
+    return func.round(cast(column + delta, Numeric), _PRECISION)
+
+
+def _at_least_zero(expr):
+    return case((expr < 0, 0), else_=expr)
+
+
+_months = MonthAggregate.__table__
+_weeks = WeekAggregate.__table__
+
+
+def _month_update(sign: int):
+    """UPDATE of one month by signed deltas, run as executemany over the months."""
+    count = _months.c.shift_count + bindparam("_count")
+    if sign > 0:
+        # A month gets the plan's version when its first shift arrives and
+        # loses it as soon as a shift from another version is added.
+        version = case(
+            (_months.c.shift_count == 0, bindparam("_version")),
+            (_months.c.settings_version == bindparam("_version"), _months.c.settings_version),
+            else_=None,
+        )
+    else:
+        version = case((count <= 0, None), else_=_months.c.settings_version)
+    return update(_months).where(
+        _months.c.user_id == bindparam("_user_id"),
+        _months.c.year == bindparam("_year"),
+        _months.c.month == bindparam("_month"),
+    ).values(
+        shift_count=_at_least_zero(count),
+        settings_version=version,
+        **{k: _added(_months.c[k], bindparam("_" + k)) for k in MONTH_SUM_KEYS},
+    )
+
+
+_MONTH_UPDATES = {sign: _month_update(sign) for sign in (1, -1)}
+
+
+def _week_upsert(db: Session):
+    stmt = upsert_insert(db, _weeks)
+    return stmt.on_conflict_do_update(
+        index_elements=[_weeks.c.user_id, _weeks.c.year, _weeks.c.month, _weeks.c.iso_year, _weeks.c.iso_week],
+        set_={
+            "shift_count": _at_least_zero(_weeks.c.shift_count + bindparam("_count")),
+            "total_hours": _added(_weeks.c.total_hours, bindparam("_hours")),
+        },
+    )
+
+
+def apply_deltas(
+    db: Session,
+    user_id: int,
+    rows: Iterable,
+    sign: int,
+    settings_version: Optional[str] = None,
+):
+    """
+    Add (sign=1) or subtract (sign=-1) shift values from the aggregates.
+
+    `rows` are Shift objects or dicts with the `snapshot()` fields. Deltas
+    are grouped per month and week first, and each table gets one statement
+    executed over them. The arithmetic runs in the database (col = col +
+    delta), so concurrent writers to the same month serialise on the row
+    instead of overwriting each other's read-modify-write.
+    Removals must be applied before the shift itself is modified or
+    deleted, so that a month seeded from stored shifts sees the old values.
+    """
+    month_deltas: Dict[MonthKey, Dict[str, float]] = {}
+    week_deltas: Dict[WeekKey, List[float]] = {}
+    _sum_rows(rows, month_deltas, week_deltas)
+
+    if not month_deltas:
+        return
+    years = {year for year, _ in month_deltas}
+    existing = set(db.execute(
+        select(MonthAggregate.year, MonthAggregate.month).where(
+            MonthAggregate.user_id == user_id, MonthAggregate.year.in_(years),
+        )
+    ).tuples())
+    missing = month_deltas.keys() - existing
+    if missing:
+        _seed_months(db, user_id, missing)
+
+    db.execute(_MONTH_UPDATES[sign], [
+        {"_user_id": user_id, "_year": year, "_month": month, "_version": settings_version,
+         "_count": sign * delta["shift_count"], **{"_" + k: sign * delta[k] for k in MONTH_SUM_KEYS}}
+        for (year, month), delta in month_deltas.items()
+    ])
+    db.execute(_week_upsert(db), [
+        {"user_id": user_id, "year": year, "month": month, "iso_year": iso_year, "iso_week": iso_week,
+         "shift_count": max(0, sign * count), "total_hours": round(max(0.0, sign * hours), _PRECISION),
+         "_count": sign * count, "_hours": sign * hours}
+        for (year, month, iso_year, iso_week), (count, hours) in week_deltas.items()
+    ])
+
+
+def add_shifts(db: Session, user_id: int, shifts: Iterable[Shift], plan: RatePlan):
+    apply_deltas(db, user_id, shifts, 1, plan.version)
+
+
+def remove_shifts(db: Session, user_id: int, rows: Iterable):
+    apply_deltas(db, user_id, rows, -1)
+
+
+def stamp_months(db: Session, user_id: int, settings_version: str, exclude: Iterable[MonthKey] = ()):
+    """
+    Mark the user's non-empty months, except `exclude`, as calculated under
+    `settings_version`, after all their shifts were recalculated with it.
+    Does not commit.
+    """
+    stmt = update(MonthAggregate).where(MonthAggregate.user_id == user_id, MonthAggregate.shift_count > 0)
+    excluded = list(exclude)
+    if excluded:
+        stmt = stmt.where(tuple_(MonthAggregate.year, MonthAggregate.month).not_in(excluded))
+    db.execute(stmt.values(settings_version=settings_version).execution_options(synchronize_session=False))
+
+
+def month_from_aggregates(db: Session, user_id: int, year: int, month: int, plan: RatePlan) -> Optional[Dict]:
+    """
+    Month totals from the aggregate rows, or None when they cannot be used:
+    no row yet (shifts stored before aggregates existed) or shifts in the
+    month were calculated under other settings than `plan`.
+    """
+    agg = db.query(MonthAggregate).filter(
+        MonthAggregate.user_id == user_id,
+        MonthAggregate.year == year,
+        MonthAggregate.month == month,
+    ).first()
+    if agg is None or (agg.shift_count and agg.settings_version != plan.version):
+        return None
+    weeks = db.query(WeekAggregate.iso_year, WeekAggregate.iso_week, WeekAggregate.total_hours).filter(
+        WeekAggregate.user_id == user_id,
+        WeekAggregate.year == year,
+        WeekAggregate.month == month,
+        WeekAggregate.shift_count > 0,
+    ).all()
+    totals = {k: getattr(agg, k) for k in MONTH_SUM_KEYS}
+    week_hours = {(y, w): hours for y, w, hours in weeks}
+    return {"shifts_count": agg.shift_count, **month_totals(totals, week_hours, plan)}
+
+
+def _expected(db: Session, user_id: Optional[int]):
+    q = db.query(Shift.user_id, Shift.date, *[getattr(Shift, k) for k in MONTH_SUM_KEYS])
+    if user_id is not None:
+        q = q.filter(Shift.user_id == user_id)
+    months: Dict[Tuple, Dict[str, float]] = {}
+    weeks: Dict[Tuple, List[float]] = {}
+    by_user: Dict[int, List[Dict]] = {}
+    for uid, shift_date, *values in q.yield_per(1000):
+        by_user.setdefault(uid, []).append({"date": shift_date, **dict(zip(MONTH_SUM_KEYS, values))})
+    for uid, rows in by_user.items():
+        _sum_rows(rows, months, weeks, (uid,))
+    return months, weeks
+
+
+def _differs(field: str, stored: float, expected: float) -> bool:
+    return abs((stored or 0.0) - expected) > _TOLERANCE.get(field, _DEFAULT_TOLERANCE)
+
+
+def check_aggregates(db: Session, user_id: Optional[int] = None, repair: bool = False) -> Dict:
+    """
+    Rebuild the aggregates from the stored shifts and compare them with the
+    maintained rows. With `repair`, drifted or missing rows are rewritten
+    (months keep their settings version only if they had not drifted).
+    """
+    exp_months, exp_weeks = _expected(db, user_id)
+
+    mq = db.query(MonthAggregate)
+    wq = db.query(WeekAggregate)
+    if user_id is not None:
+        mq = mq.filter(MonthAggregate.user_id == user_id)
+        wq = wq.filter(WeekAggregate.user_id == user_id)
+    stored_months = {(a.user_id, a.year, a.month): a for a in mq.all()}
+    stored_weeks = {(a.user_id, a.year, a.month, a.iso_year, a.iso_week): a for a in wq.all()}
+
+    drift = []
+    for key in sorted(set(exp_months) | set(stored_months)):
+        expected = exp_months.get(key, _empty_sums())
+        agg = stored_months.get(key)
+        fields = {
+            f: {"stored": getattr(agg, f) if agg else None, "expected": round(v, _PRECISION)}
+            for f, v in expected.items()
+            if agg is None or _differs(f, getattr(agg, f), v)
+        }
+        if agg is None and not expected["shift_count"]:
+            continue
+        if fields:
+            drift.append({"user_id": key[0], "year": key[1], "month": key[2], "week": None, "fields": fields})
+            if repair:
+                if agg is None:
+                    agg = MonthAggregate(user_id=key[0], year=key[1], month=key[2])
+                    db.add(agg)
+                else:
+                    agg.settings_version = None
+                for f, v in expected.items():
+                    setattr(agg, f, round(v, _PRECISION))
+
+    for key in sorted(set(exp_weeks) | set(stored_weeks)):
+        count, hours = exp_weeks.get(key, (0, 0.0))
+        agg = stored_weeks.get(key)
+        if agg is None and not count:
+            continue
+        if agg is None or agg.shift_count != count or _differs("total_hours", agg.total_hours, hours):
+            drift.append({
+                "user_id": key[0], "year": key[1], "month": key[2], "week": [key[3], key[4]],
+                "fields": {
+                    "shift_count": {"stored": agg.shift_count if agg else None, "expected": count},
+                    "total_hours": {"stored": agg.total_hours if agg else None, "expected": round(hours, _PRECISION)},
+                },
+            })
+            if repair:
+                if agg is None:
+                    agg = WeekAggregate(user_id=key[0], year=key[1], month=key[2], iso_year=key[3], iso_week=key[4])
+                    db.add(agg)
+                agg.shift_count = count
+                agg.total_hours = round(hours, _PRECISION)
+
+    if repair:
+        bump_revisions(db, {d["user_id"] for d in drift})
+        db.commit()
+    return {
+        "months_checked": len(set(exp_months) | set(stored_months)),
+        "weeks_checked": len(set(exp_weeks) | set(stored_weeks)),
+        "drift": drift,
+        "repaired": repair and bool(drift),
+    }
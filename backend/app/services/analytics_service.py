@@ -0,0 +1,120 @@
+"""
+Admin analytics: hours, pay, overtime and night/weekend share over a period.
+
+Sums are computed by the database with GROUP BY over the stored Shift
+columns (per user, workplace or month); no ORM objects are loaded, and the
+shift columns are read from the covering ix_shifts_user_id_date_totals
+index. Results are cached per (grouping, period) and keyed on the data
+generation, which every user revision bump and user deletion increments, so
+any write to a user's shifts or profile makes the next request recompute
+instead of serving stale sums. Reading it is one primary-key lookup.
+"""
+
+from datetime import date
+from typing import Dict, List, Literal
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.shift import Shift
+from ..models.user import User
+from ..utils.time_utils import month_range
+from .calc_cache import LRUCache
+from .revision_service import current_generation
+
+GroupBy = Literal["user", "workplace", "month"]
+
+# Month grouping issues one SELECT per month; SQLite allows 500 per statement.
+ANALYTICS_MAX_DAYS = 20 * 366
+
+analytics_cache = LRUCache(settings.ANALYTICS_CACHE_SIZE)
+
+_SUMS = (
+    func.count(Shift.id).label("shifts_count"),
+    func.coalesce(func.sum(Shift.total_hours), 0.0).label("total_hours"),
+    func.coalesce(func.sum(Shift.gross_pay), 0.0).label("gross_pay"),
+    func.coalesce(func.sum(Shift.overtime_50_hours + Shift.overtime_100_hours), 0.0).label("overtime_hours"),
+    func.coalesce(func.sum(Shift.night_hours), 0.0).label("night_hours"),
+    func.coalesce(func.sum(Shift.weekend_hours), 0.0).label("weekend_hours"),
+)
+_SUM_KEYS = [c.name for c in _SUMS]
+
+
+def _metrics(sums: Dict) -> Dict:
+    hours = sums["total_hours"]
+    return {
+        "shifts_count": sums["shifts_count"],
+        "total_hours": round(hours, 2),
+        "gross_pay": round(sums["gross_pay"], 2),
+        "overtime_hours": round(sums["overtime_hours"], 2),
+        "night_hours": round(sums["night_hours"], 2),
+        "weekend_hours": round(sums["weekend_hours"], 2),
+        "night_share": round(sums["night_hours"] / hours, 4) if hours else 0.0,
+        "weekend_share": round(sums["weekend_hours"] / hours, 4) if hours else 0.0,
+    }
+
+
+def _per_user(first: date, last: date):
+    # Grouping by user_id follows the covering (user_id, date, ...) index, so
+    # the range is read from the index alone and without a sort.
+    return select(Shift.user_id, *_SUMS).where(Shift.date.between(first, last)).group_by(Shift.user_id).subquery()
+
+
+def _months(first: date, last: date):
+    """Each month of [first, last] as its own per-user window, clipped to the period."""
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        start, end = month_range(year, month)
+        yield year, month, max(start, first), min(end, last)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _query(group_by: GroupBy, first: date, last: date):
+    if group_by == "month":
+        # One window per month (UNION ALL) instead of grouping on a date
+        # expression, which would be evaluated for every row.
+        windows = []
+        for year, month, start, end in _months(first, last):
+            per_user = _per_user(start, end)
+            windows.append(select(
+                literal(year).label("year"), literal(month).label("month"), func.count().label("users"),
+                *[func.coalesce(func.sum(per_user.c[k]), 0).label(k) for k in _SUM_KEYS],
+            ).select_from(per_user).having(func.count() > 0))
+        return union_all(*windows).order_by("year", "month")
+
+    # Only one row per user is joined with users.
+    per_user = _per_user(first, last)
+    if group_by == "user":
+        sums = [per_user.c[k] for k in _SUM_KEYS]
+        q = select(User.id.label("user_id"), User.name, User.workplace, *sums)
+        return q.join(per_user, per_user.c.user_id == User.id).order_by(User.name, User.id)
+    sums = [func.sum(per_user.c[k]).label(k) for k in _SUM_KEYS]
+    q = select(User.workplace, func.count().label("users"), *sums).join(per_user, per_user.c.user_id == User.id)
+    return q.group_by(User.workplace).order_by(User.workplace)
+
+
+def _compute(db: Session, first: date, last: date, group_by: GroupBy) -> Dict:
+    groups: List[Dict] = []
+    totals = dict.fromkeys(_SUM_KEYS, 0)
+    for row in db.execute(_query(group_by, first, last)).mappings():
+        sums = {k: row[k] for k in _SUM_KEYS}
+        for k in _SUM_KEYS:
+            totals[k] += sums[k]
+        groups.append({**{k: v for k, v in row.items() if k not in sums}, **_metrics(sums)})
+    return {
+        "from_date": first,
+        "to_date": last,
+        "group_by": group_by,
+        "totals": _metrics(totals),
+        "groups": groups,
+    }
+
+
+def shift_analytics(db: Session, first: date, last: date, group_by: GroupBy) -> Dict:
+    key = (group_by, first, last, current_generation(db))
+    result = analytics_cache.get(key)
+    if result is None:
+        result = _compute(db, first, last, group_by)
+        analytics_cache.put(key, result)
+    return result
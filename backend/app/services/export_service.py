@@ -63,7 +63,7 @@ def generate_excel(shifts: List[Shift], user: User, summary: MonthSummary = None
 
     for row_idx, s in enumerate(shifts, 2):
         row_data = [
-            s.date, s.start_time, s.end_time, s.pause_min,
+            str(s.date), s.start_time, s.end_time, s.pause_min,
             round(s.total_hours, 2), round(s.base_hours, 2),
             round(s.evening_hours, 2), round(s.night_hours, 2),
             round(s.weekend_hours, 2), round(s.holiday_hours, 2),
@@ -146,7 +146,7 @@ def generate_pdf(shifts: List[Shift], user: User, summary: MonthSummary = None)
     data = [["Dato", "Start", "Slutt", "Timer", "Brutto (kr)", "Notat"]]
     for s in shifts:
         data.append([
-            s.date, s.start_time, s.end_time,
+            str(s.date), s.start_time, s.end_time,
             f"{s.total_hours:.2f}", f"{s.gross_pay:.2f}",
             (s.note or "")[:30]
         ])
@@ -1,19 +1,152 @@
-"""Norwegian public holidays using the `holidays` library."""
+"""
+Norwegian public holidays.
 
-import holidays
+Holidays are kept in a HolidayIndex: a byte-per-day bitmap over a
+contiguous range of years, indexed by proleptic day ordinal
+(date.toordinal). Lookups are O(1), and `holiday_flags` flags a whole NumPy
+array of ordinals at once. Years are added lazily the first time a day in
+them is looked up. The index can be preloaded from a JSON file
+(HOLIDAY_INDEX_FILE, written by `python -m app.cli holidays-export`), in
+which case the `holidays` library is only imported for years outside the
+file.
+
+The bitmap is limited to INDEX_YEARS so a stray far-future date cannot grow
+it without bound; days outside are looked up in the library directly.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
 from datetime import date
 from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.startup import lazy_module
+
+np = lazy_module("numpy")
+
+INDEX_YEARS = (1900, 2200)
+
+
+def _library_holidays(first_year: int, last_year: int) -> Dict[date, str]:
+    import holidays  # deferred: not needed at all with a preloaded file
+
+    return dict(holidays.Norway(years=range(first_year, last_year + 1)).items())
 
 
 @lru_cache(maxsize=10)
-def _get_norwegian_holidays(year: int):
-    return holidays.Norway(years=year)
+def _outside_index(year: int) -> Dict[date, str]:
+    return _library_holidays(year, year)
+
+
+class HolidayIndex:
+    def __init__(self):
+        # (first_year, last_year, base ordinal, bitmap, bitmap as uint8 array);
+        # replaced as a whole so readers never need the lock
+        self._state: Optional[Tuple[int, int, int, bytes, np.ndarray]] = None
+        self._names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _install(self, first_year: int, last_year: int, holidays: Dict[date, str]):
+        """Cover [first_year, last_year] with the known holidays; caller holds the lock."""
+        self._names.update({d.toordinal(): name for d, name in holidays.items()})
+        base = date(first_year, 1, 1).toordinal()
+        bitmap = bytearray(date(last_year, 12, 31).toordinal() - base + 1)
+        for ordinal in self._names:
+            if 0 <= ordinal - base < len(bitmap):
+                bitmap[ordinal - base] = 1
+        bitmap = bytes(bitmap)
+        self._state = (first_year, last_year, base, bitmap, np.frombuffer(bitmap, dtype=np.uint8))
+
+    def ensure_years(self, first_year: int, last_year: int):
+        """Cover [first_year, last_year] (clipped to INDEX_YEARS), keeping the range contiguous."""
+        first_year, last_year = max(first_year, INDEX_YEARS[0]), min(last_year, INDEX_YEARS[1])
+        state = self._state
+        if first_year > last_year or (state and state[0] <= first_year and last_year <= state[1]):
+            return
+        with self._lock:
+            state = self._state
+            if state is None:
+                self._install(first_year, last_year, _library_holidays(first_year, last_year))
+                return
+            lo, hi = state[0], state[1]
+            if first_year >= lo and last_year <= hi:
+                return
+            missing: Dict[date, str] = {}
+            if first_year < lo:
+                missing.update(_library_holidays(first_year, lo - 1))
+            if last_year > hi:
+                missing.update(_library_holidays(hi + 1, last_year))
+            self._install(min(first_year, lo), max(last_year, hi), missing)
+
+    def contains(self, ordinal: int) -> bool:
+        state = self._state
+        if state is None or not 0 <= ordinal - state[2] < len(state[3]):
+            d = date.fromordinal(ordinal)
+            if not INDEX_YEARS[0] <= d.year <= INDEX_YEARS[1]:
+                return d in _outside_index(d.year)
+            self.ensure_years(d.year, d.year)
+            state = self._state
+        return state[3][ordinal - state[2]] == 1
+
+    def flags(self, ordinals: np.ndarray) -> np.ndarray:
+        """Boolean array, True where the ordinal is a holiday."""
+        if ordinals.size == 0:
+            return np.zeros(ordinals.shape, dtype=bool)
+        lo, hi = int(ordinals.min()), int(ordinals.max())
+        self.ensure_years(date.fromordinal(lo).year, date.fromordinal(hi).year)
+        _, _, base, bitmap, array = self._state
+        offset = ordinals - base
+        if lo - base >= 0 and hi - base < len(bitmap):
+            return array[offset].astype(bool)
+        inside = (offset >= 0) & (offset < len(bitmap))
+        result = np.zeros(ordinals.shape, dtype=bool)
+        result[inside] = array[offset[inside]].astype(bool)
+        for i in np.flatnonzero(~inside):
+            result.flat[i] = self.contains(int(ordinals.flat[i]))
+        return result
+
+    def between(self, first: date, last: date) -> List[Tuple[date, str]]:
+        """(date, name) of the holidays in [first, last], sorted."""
+        self.ensure_years(first.year, last.year)
+        lo, hi = first.toordinal(), last.toordinal()
+        days = [(date.fromordinal(o), name) for o, name in self._names.items() if lo <= o <= hi]
+        for year in range(first.year, last.year + 1):
+            if not INDEX_YEARS[0] <= year <= INDEX_YEARS[1]:
+                days += [(d, name) for d, name in _outside_index(year).items() if first <= d <= last]
+        return sorted(days)
+
+    def load(self, path: str):
+        """Preload from a file written by `export`; other years still load lazily."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        first_year, last_year = data["years"]
+        holidays = {date.fromisoformat(d): name for d, name in data["holidays"].items()}
+        with self._lock:
+            self._install(first_year, last_year, holidays)
+
+    def export(self, path: str, first_year: int, last_year: int):
+        days = self.between(date(first_year, 1, 1), date(last_year, 12, 31))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"years": [first_year, last_year], "holidays": {str(d): name for d, name in days}},
+                      f, ensure_ascii=False, indent=0)
+
+
+holiday_index = HolidayIndex()
+if settings.HOLIDAY_INDEX_FILE:
+    holiday_index.load(settings.HOLIDAY_INDEX_FILE)
 
 
 def is_norwegian_holiday(d: date) -> bool:
-    return d in _get_norwegian_holidays(d.year)
+    return holiday_index.contains(d.toordinal())
+
+
+def holiday_flags(ordinals: np.ndarray) -> np.ndarray:
+    return holiday_index.flags(ordinals)
 
 
 def get_holidays_for_month(year: int, month: int) -> list[str]:
-    h = _get_norwegian_holidays(year)
-    return [str(d) for d in h if d.year == year and d.month == month]
+    last = date(year + month // 12, month % 12 + 1, 1).toordinal() - 1
+    return [str(d) for d, _ in holiday_index.between(date(year, month, 1), date.fromordinal(last))]
@@ -4,6 +4,8 @@ import io
 from datetime import datetime
 from typing import List, Dict, Any, Tuple
 
+from ..utils.parsing import canonical_time, parse_date
+
 
 def parse_excel(file_bytes: bytes, name_filter: str = None) -> Tuple[List[Dict], List[str]]:
     """Parse an .xlsx file and return (shifts, errors)."""
@@ -113,7 +115,11 @@ def _parse_date(value) -> str:
     if isinstance(value, datetime):
         return value.strftime("%Y-%m-%d")
     s = str(value).strip()
-    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y"):
+    try:
+        return parse_date(s).isoformat()
+    except ValueError:
+        pass
+    for fmt in ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y"):
         try:
             return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
         except ValueError:
@@ -127,7 +133,10 @@ def _parse_time(value) -> str:
     if isinstance(value, datetime):
         return value.strftime("%H:%M")
     s = str(value).strip()
-    for fmt in ("%H:%M", "%H.%M", "%H:%M:%S"):
+    canonical = canonical_time(s)
+    if canonical:
+        return canonical
+    for fmt in ("%H.%M", "%H:%M:%S"):
         try:
             return datetime.strptime(s, fmt).strftime("%H:%M")
         except ValueError:
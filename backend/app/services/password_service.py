@@ -0,0 +1,118 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately slow (hundreds of milliseconds at cost 12), so hashing
+and verification run in a dedicated process pool instead of Starlette's
+threadpool, where a burst of logins would hold every slot. Admission is
+bounded: once PASSWORD_QUEUE_LIMIT jobs are queued or running, new ones are
+rejected at once with PasswordHashingBusy (HTTP 503) rather than queued
+behind the burst. The app creates the pool at startup (see `start`).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from ..utils.processes import process_pool
+from ..utils.security import hash_password, verify_and_update_password
+
+
+class PasswordHashingBusy(Exception):
+    """The queue is at PASSWORD_QUEUE_LIMIT."""
+
+
+def _timed(fn, *args) -> Tuple[Any, float]:
+    """Worker entry point: fn(*args) and its compute time in ms."""
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_limit: int, window: int = 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._latency: "deque[float]" = deque(maxlen=window)     # queue wait + compute, ms
+        self._compute: "deque[float]" = deque(maxlen=window)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = process_pool(self.workers)
+            return self._pool
+
+    def start(self):
+        """Create the pool up front; workers start with the first job."""
+        self._executor()
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.queue_limit:
+                self.rejected += 1
+                raise PasswordHashingBusy()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        t0 = time.perf_counter()
+        try:
+            result, compute_ms = await asyncio.get_running_loop().run_in_executor(self._executor(), _timed, fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.completed += 1
+            self._latency.append((time.perf_counter() - t0) * 1000)
+            self._compute.append(compute_ms)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash when the stored one has another cost)."""
+        valid, new_hash = await self._run(verify_and_update_password, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latency, compute = sorted(self._latency), sorted(self._compute)
+
+            def pct(samples, p: float) -> Optional[float]:
+                return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3) if samples else None
+
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "latency_ms": {"p50": pct(latency, 0.5), "p95": pct(latency, 0.95), "p99": pct(latency, 0.99)},
+                "compute_ms": {"p50": pct(compute, 0.5), "p95": pct(compute, 0.95), "p99": pct(compute, 0.99)},
+            }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_WORKERS, settings.PASSWORD_QUEUE_LIMIT)
@@ -0,0 +1,188 @@
+"""
+Organisation-wide payroll run.
+
+Computes the month totals of every active user for one period, and
+optionally saves them as MonthSummary rows. Users are processed in chunks:
+the parent process reads each chunk's shifts and settings with one query
+apiece, and the month calculation runs in a process pool. Results are
+yielded per user as chunks finish, followed by a final summary record.
+
+Saving happens in the parent process, so the workers never touch the
+database. Locked months are computed but not overwritten. Workers are not
+forked from the server process (see utils/processes.py), so they receive
+everything they need as pickled arguments.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.month_summary import MonthSummary
+from ..models.shift import Shift
+from ..models.user import User
+from ..models.wage_settings import WageSettings
+from .rate_plan import get_rate_plan
+from .revision_service import MONTH_SUMMARY, bump_revision
+from .wage_engine import calculate_month
+from ..utils.processes import process_pool
+from ..utils.time_utils import month_range
+
+# Plain rows are cheap to pickle; the engine only reads these attributes.
+ShiftRow = namedtuple("ShiftRow", "date start_time end_time pause_min")
+
+
+def _compute_chunk(year: int, month: int, users: List[tuple]) -> List[dict]:
+    """Worker entry point: users is a list of (user_id, plan, shift rows)."""
+    out = []
+    for user_id, plan, rows in users:
+        t0 = time.perf_counter()
+        totals = calculate_month(rows, plan)
+        out.append({
+            "user_id": user_id,
+            "year": year,
+            "month": month,
+            "shifts_count": len(rows),
+            **totals,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+        })
+    return out
+
+
+def _load_chunk(db: Session, user_ids: List[int], year: int, month: int) -> List[tuple]:
+    first, last = month_range(year, month)
+    rows: Dict[int, list] = {uid: [] for uid in user_ids}
+    for r in db.query(
+        Shift.user_id, Shift.date, Shift.start_time, Shift.end_time, Shift.pause_min
+    ).filter(Shift.user_id.in_(user_ids), Shift.date.between(first, last)):
+        rows[r.user_id].append(ShiftRow(r.date, r.start_time, r.end_time, r.pause_min))
+    ws_by_user = {
+        ws.user_id: ws
+        for ws in db.query(WageSettings).filter(WageSettings.user_id.in_(user_ids))
+    }
+    return [
+        (uid, get_rate_plan(ws_by_user.get(uid) or WageSettings(user_id=uid)), rows[uid])
+        for uid in user_ids
+    ]
+
+
+def _save(db: Session, result: dict, summaries: Dict[int, MonthSummary]) -> str:
+    """Upsert the user's MonthSummary; returns 'saved' or 'locked'."""
+    summary = summaries.get(result["user_id"])
+    if summary is not None and summary.is_locked:
+        return "locked"
+    values = {k: v for k, v in result.items() if hasattr(MonthSummary, k) and k != "user_id"}
+    if summary is None:
+        db.add(MonthSummary(user_id=result["user_id"], **values))
+    else:
+        for k, v in values.items():
+            setattr(summary, k, v)
+    return "saved"
+
+
+def _active_user_ids(db: Session, user_ids: Optional[List[int]]) -> List[int]:
+    q = db.query(User.id).filter(User.is_active == True, User.is_admin == False)  # noqa: E712
+    if user_ids:
+        q = q.filter(User.id.in_(user_ids))
+    return [uid for (uid,) in q.order_by(User.id).all()]
+
+
+def max_workers() -> int:
+    """Process pool size: PAYROLL_WORKERS, or the CPU count when that is 0."""
+    return settings.PAYROLL_WORKERS or os.cpu_count() or 1
+
+
+def run_payroll(
+    year: int,
+    month: int,
+    save: bool = False,
+    workers: Optional[int] = None,
+    user_ids: Optional[List[int]] = None,
+) -> Iterator[dict]:
+    """
+    Yield one record per user ({"type": "user", ...}) in completion order,
+    then a {"type": "summary", ...} record with totals and wall time.
+    workers <= 1 computes in-process without a pool; more than
+    `max_workers()` are capped to it.
+    """
+    started = time.perf_counter()
+    workers = min(workers, max_workers()) if workers is not None else max_workers()
+    chunk_size = max(1, settings.PAYROLL_CHUNK_USERS)
+    counts = {"users": 0, "shifts": 0, "saved": 0, "locked": 0}
+    gross_total = 0.0
+
+    db = SessionLocal()
+    pool = process_pool(workers) if workers > 1 else None
+    try:
+        ids = _active_user_ids(db, user_ids)
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+        def finished(results: List[dict]) -> Iterator[dict]:
+            nonlocal gross_total
+            summaries = {}
+            saved: List[int] = []
+            if save:
+                summaries = {
+                    s.user_id: s for s in db.query(MonthSummary).filter(
+                        MonthSummary.user_id.in_([r["user_id"] for r in results]),
+                        MonthSummary.year == year,
+                        MonthSummary.month == month,
+                    )
+                }
+            for result in results:
+                counts["users"] += 1
+                counts["shifts"] += result["shifts_count"]
+                gross_total += result["gross_pay"]
+                record = {"type": "user", **result}
+                if save:
+                    record["status"] = _save(db, result, summaries)
+                    counts[record["status"]] += 1
+                    if record["status"] == "saved":
+                        saved.append(result["user_id"])
+                yield record
+            if save:
+                db.flush()
+                for uid, summary_id in db.query(MonthSummary.user_id, MonthSummary.id).filter(
+                    MonthSummary.user_id.in_(saved), MonthSummary.year == year, MonthSummary.month == month,
+                ):
+                    bump_revision(db, uid, upserted={MONTH_SUMMARY: [summary_id]})
+                db.commit()
+
+        if pool is None:
+            for chunk in chunks:
+                yield from finished(_compute_chunk(year, month, _load_chunk(db, chunk, year, month)))
+        else:
+            # Keep a bounded number of chunks in flight so memory stays flat.
+            pending = set()
+            queue = iter(chunks)
+            while True:
+                for chunk in queue:
+                    pending.add(pool.submit(_compute_chunk, year, month, _load_chunk(db, chunk, year, month)))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from finished(future.result())
+
+        yield {
+            "type": "summary",
+            "year": year,
+            "month": month,
+            "workers": workers,
+            "users": counts["users"],
+            "shifts": counts["shifts"],
+            "gross_pay": round(gross_total, 2),
+            **({"saved": counts["saved"], "locked": counts["locked"]} if save else {}),
+            "wall_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        db.close()
@@ -0,0 +1,202 @@
+"""
+Cache of authenticated-user principals.
+
+`get_current_user` used to load the user row on every request. It now keeps
+a small Principal (id, is_admin, is_active, name) per user id in a bounded
+LRU with a TTL, so a user lookup happens at most once per TTL per process.
+
+Changes to a user (profile update, activation, deletion) call
+`invalidate_principal`, which evicts the local entry and, when
+AUTH_CACHE_BUS_FILE is set, appends the id to a SQLite file shared by the
+workers on the host. Every process polls that file from a background thread
+and evicts the ids it has not seen. Without the bus, other workers pick up
+a change when their entry expires.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    is_admin: bool
+    is_active: bool
+    name: str
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0     # bumped by every discard
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._data[user_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, principal: Principal, generation: Optional[int] = None):
+        """Store principal; pass the generation read before loading it so a
+        row loaded while an invalidation ran is not cached."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._data.move_to_end(principal.id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            if self._data.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class InvalidationBus:
+    """Append-only log of invalidated user ids in a SQLite file shared by local workers."""
+
+    def __init__(self, path: str, poll_interval: float, cache: PrincipalCache):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS principal_invalidations "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        return conn
+
+    def start(self):
+        """Start polling (once per process); only ids published after this are applied."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            conn = self._connect()
+            self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM principal_invalidations").fetchone()[0]
+            self._thread = threading.Thread(target=self._poll, args=(conn,), name="principal-bus", daemon=True)
+            self._thread.start()
+
+    def publish(self, user_id: int):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT INTO principal_invalidations (user_id, created) VALUES (?, ?)",
+                    (user_id, time.time()),
+                )
+                # Entries well past the TTL can no longer refer to a cached principal.
+                conn.execute(
+                    "DELETE FROM principal_invalidations WHERE created < ?",
+                    (time.time() - 2 * self.cache.ttl - 60,),
+                )
+            finally:
+                conn.close()
+            self.published += 1
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("principal invalidation for user %s not published", user_id)
+
+    def _poll(self, conn: sqlite3.Connection):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = conn.execute(
+                    "SELECT id, user_id FROM principal_invalidations WHERE id > ? ORDER BY id",
+                    (self._last_id,),
+                ).fetchall()
+            except sqlite3.Error:
+                self.errors += 1
+                continue
+            for row_id, user_id in rows:
+                self.cache.discard(user_id)
+                self._last_id = row_id
+                self.received += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "poll_interval_s": self.poll_interval,
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_S)
+invalidation_bus = (
+    InvalidationBus(settings.AUTH_CACHE_BUS_FILE, settings.AUTH_CACHE_BUS_POLL_S, principal_cache)
+    if settings.AUTH_CACHE_BUS_FILE else None
+)
+
+
+def invalidate_principal(user_id: int):
+    """Drop the cached principal here and, with the bus, in the other workers."""
+    principal_cache.discard(user_id)
+    if invalidation_bus is not None:
+        invalidation_bus.publish(user_id)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        **principal_cache.stats(),
+        "bus": invalidation_bus.stats() if invalidation_bus is not None else None,
+    }
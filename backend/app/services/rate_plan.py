@@ -0,0 +1,154 @@
+"""
+Compiled rate plans.
+
+A RatePlan is an immutable, pre-parsed view of a user's WageSettings: time
+windows as integer minutes, allowances resolved to kr/hour and the overtime
+thresholds. The wage engine only ever reads plans, so no settings strings
+are parsed on the hot path.
+
+Plans are cached per user and keyed by a fingerprint of the settings row
+(the "settings version"), so a stale plan is never returned even if another
+worker changed the row. `invalidate_rate_plan` drops the entry eagerly.
+The version also covers ENGINE_VERSION, so figures stored under older
+engine rules never match a current plan.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.wage_settings import WageSettings
+from ..utils.time_utils import MINUTES_PER_DAY, clock_minutes
+
+# Bump when the wage engine's rules change how the same settings are paid.
+# 2: weekend/holiday per calendar day of each minute; the night window
+#    includes the one that started the day before.
+ENGINE_VERSION = 2
+
+# Columns that affect calculations, in fingerprint order.
+_PLAN_FIELDS = (
+    "hourly_rate",
+    "evening_allowance_type", "evening_allowance_value", "evening_from", "evening_to",
+    "night_allowance_type", "night_allowance_value", "night_from", "night_to",
+    "weekend_allowance_type", "weekend_allowance_value",
+    "holiday_allowance_type", "holiday_allowance_value",
+    "overtime_daily_threshold", "overtime_weekly_threshold",
+    "overtime_50_rate", "overtime_100_rate",
+    "paid_pause", "rounding_minutes", "rounding_method",
+    "tax_percent", "holiday_pay_percent",
+)
+
+
+@dataclass(frozen=True)
+class RatePlan:
+    fingerprint: Tuple
+    version: str            # short stable hash of ENGINE_VERSION and the fingerprint
+    hourly_rate: float
+    # (start, end) minutes relative to the window's own day; end > start,
+    # so cross-midnight windows end after 1440. None = allowance disabled.
+    evening_window: Optional[Tuple[int, int]]
+    night_window: Optional[Tuple[int, int]]
+    evening_kr: float       # kr per hour
+    night_kr: float
+    weekend_kr: float
+    holiday_kr: float
+    overtime_daily_threshold: float
+    overtime_weekly_threshold: float
+    overtime_50_rate: float
+    overtime_100_rate: float
+    paid_pause: bool
+    rounding_minutes: int
+    rounding_method: str
+    tax_percent: float
+    holiday_pay_percent: float
+
+
+_cache: Dict[int, RatePlan] = {}
+_lock = Lock()
+
+
+def _value(ws: WageSettings, field: str):
+    """Attribute value, falling back to the column default for unsaved rows."""
+    v = getattr(ws, field)
+    if v is None:
+        default = WageSettings.__table__.c[field].default
+        v = default.arg if default is not None else None
+    return v
+
+
+def settings_fingerprint(ws: WageSettings) -> Tuple:
+    return tuple(_value(ws, f) for f in _PLAN_FIELDS)
+
+
+def _window(from_str: str, to_str: str) -> Tuple[int, int]:
+    start, end = clock_minutes(from_str), clock_minutes(to_str)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def _kr_per_hour(rate: float, atype: str, avalue: float) -> float:
+    if atype == "kr":
+        return avalue
+    else:  # percent
+        return rate * (avalue / 100)
+
+
+def compile_rate_plan(ws: WageSettings) -> RatePlan:
+    fp = settings_fingerprint(ws)
+    v = dict(zip(_PLAN_FIELDS, fp))
+    rate = v["hourly_rate"]
+    return RatePlan(
+        fingerprint=fp,
+        version=hashlib.sha1(repr((ENGINE_VERSION, fp)).encode()).hexdigest()[:16],
+        hourly_rate=rate,
+        evening_window=_window(v["evening_from"], v["evening_to"]) if v["evening_allowance_value"] > 0 else None,
+        night_window=_window(v["night_from"], v["night_to"]) if v["night_allowance_value"] > 0 else None,
+        evening_kr=_kr_per_hour(rate, v["evening_allowance_type"], v["evening_allowance_value"]),
+        night_kr=_kr_per_hour(rate, v["night_allowance_type"], v["night_allowance_value"]),
+        weekend_kr=_kr_per_hour(rate, v["weekend_allowance_type"], v["weekend_allowance_value"]),
+        holiday_kr=_kr_per_hour(rate, v["holiday_allowance_type"], v["holiday_allowance_value"]),
+        overtime_daily_threshold=v["overtime_daily_threshold"],
+        overtime_weekly_threshold=v["overtime_weekly_threshold"],
+        overtime_50_rate=v["overtime_50_rate"],
+        overtime_100_rate=v["overtime_100_rate"],
+        paid_pause=bool(v["paid_pause"]),
+        rounding_minutes=v["rounding_minutes"],
+        rounding_method=v["rounding_method"],
+        tax_percent=v["tax_percent"],
+        holiday_pay_percent=v["holiday_pay_percent"],
+    )
+
+
+def plan_with_overrides(plan: RatePlan, overrides: Dict) -> RatePlan:
+    """Compile a what-if plan: `plan`'s settings with some fields replaced. Not cached."""
+    values = dict(zip(_PLAN_FIELDS, plan.fingerprint))
+    values.update({k: v for k, v in overrides.items() if k in values and v is not None})
+    return compile_rate_plan(WageSettings(**values))
+
+
+def get_rate_plan(ws: WageSettings) -> RatePlan:
+    """Return the cached plan for this settings row, compiling it if needed."""
+    if ws.user_id is None:
+        return compile_rate_plan(ws)
+    fp = settings_fingerprint(ws)
+    plan = _cache.get(ws.user_id)
+    if plan is not None and plan.fingerprint == fp:
+        return plan
+    plan = compile_rate_plan(ws)
+    with _lock:
+        _cache[ws.user_id] = plan
+    return plan
+
+
+def load_rate_plan(user_id: int, db: Session) -> RatePlan:
+    ws = db.query(WageSettings).filter(WageSettings.user_id == user_id).first()
+    return get_rate_plan(ws or WageSettings(user_id=user_id))
+
+
+def invalidate_rate_plan(user_id: int):
+    with _lock:
+        _cache.pop(user_id, None)
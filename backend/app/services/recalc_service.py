@@ -0,0 +1,203 @@
+"""
+Background recalculation of stored shifts after wage settings change.
+
+Stored shifts keep the hours and gross pay computed under the settings at
+the time they were saved. A recalculation job walks a user's shifts (or all
+users' shifts) in id-ordered chunks, evaluates each chunk with the batch
+engine and writes the results back with one bulk UPDATE per chunk, applying
+the difference to the month aggregates in the same transaction. Shifts in
+months with a locked MonthSummary are left untouched. When a user is done,
+their other months are stamped with the new rate plan.
+
+Jobs run in-process (FastAPI BackgroundTasks) and their progress is kept in
+memory, so status is only visible from the worker that runs the job.
+"""
+
+import threading
+import uuid
+from dataclasses import dataclass, asdict, field
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.month_summary import MonthSummary
+from ..models.shift import Shift
+from ..models.user import User
+from .aggregate_service import add_shifts, remove_shifts, stamp_months
+from .rate_plan import load_rate_plan
+from .revision_service import SHIFT, bump_revision, record_changes
+from .wage_engine import MONTH_SUM_KEYS, calculate_shifts_batch
+
+_CALC_COLUMNS = (Shift.id, Shift.date, Shift.start_time, Shift.end_time, Shift.pause_min)
+_SUM_COLUMNS = tuple(getattr(Shift, k) for k in MONTH_SUM_KEYS)
+_shifts = Shift.__table__
+_UPDATE_UNCHANGED = update(_shifts).where(
+    _shifts.c.id == bindparam("_id"),
+    _shifts.c.date == bindparam("_date"),
+    _shifts.c.start_time == bindparam("_start"),
+    _shifts.c.end_time == bindparam("_end"),
+    _shifts.c.pause_min.is_not_distinct_from(bindparam("_pause")),
+)
+_MAX_JOBS = 200      # finished jobs kept for status lookups
+
+
+@dataclass
+class RecalcJob:
+    id: str
+    user_id: Optional[int]          # None = all users
+    state: str = "pending"          # pending/running/done/failed/superseded
+    users_total: int = 0
+    users_done: int = 0
+    shifts_total: int = 0
+    shifts_processed: int = 0
+    shifts_updated: int = 0
+    shifts_skipped_locked: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+_jobs: Dict[str, RecalcJob] = {}
+_latest: Dict[Optional[int], str] = {}      # user_id (None = all) -> latest job id
+_lock = threading.Lock()
+
+
+def start_job(user_id: Optional[int] = None) -> RecalcJob:
+    """Register a job; the caller schedules `run_job(job.id)` in the background."""
+    job = RecalcJob(id=uuid.uuid4().hex, user_id=user_id)
+    with _lock:
+        latest = set(_latest.values())
+        for old_id in list(_jobs)[:max(0, len(_jobs) - _MAX_JOBS)]:
+            if old_id not in latest:
+                del _jobs[old_id]
+        _jobs[job.id] = job
+        _latest[user_id] = job.id
+    return job
+
+
+def get_job(job_id: str) -> Optional[RecalcJob]:
+    return _jobs.get(job_id)
+
+
+def latest_job(user_id: Optional[int]) -> Optional[RecalcJob]:
+    job_id = _latest.get(user_id)
+    return _jobs.get(job_id) if job_id else None
+
+
+def _superseded(job: RecalcJob) -> bool:
+    return _latest.get(job.user_id) != job.id
+
+
+def _locked_months(db: Session, user_id: int) -> set:
+    rows = db.query(MonthSummary.year, MonthSummary.month).filter(
+        MonthSummary.user_id == user_id,
+        MonthSummary.is_locked == True,  # noqa: E712
+    ).all()
+    return {(y, m) for y, m in rows}
+
+
+def _month_of(shift_date: date):
+    return shift_date.year, shift_date.month
+
+
+def _inputs(row) -> tuple:
+    return row.date, row.start_time, row.end_time, row.pause_min
+
+
+def _recalculate_chunk(db: Session, job: RecalcJob, user_id: int, plan, locked: set, after_id: int) -> Optional[int]:
+    """Recalculate the next chunk of the user's shifts; the last id, or None when done."""
+    chunk = db.query(*_CALC_COLUMNS).filter(
+        Shift.user_id == user_id,
+        Shift.id > after_id,
+    ).order_by(Shift.id).limit(settings.RECALC_CHUNK_SIZE).all()
+    if not chunk:
+        return None
+    todo = [row for row in chunk if _month_of(row.date) not in locked]
+    job.shifts_skipped_locked += len(chunk) - len(todo)
+    results = {row.id: (_inputs(row), result) for row, result in zip(todo, calculate_shifts_batch(todo, plan))}
+
+    if results:
+        # The engine ran without a lock. Bumping takes the lock other shift
+        # writers take first (the SQLite write lock, or the user's revision
+        # row); the rows are then read again and only those still holding
+        # the inputs calculated above are written. Edited ones were just
+        # calculated under this plan by their writer.
+        revision = bump_revision(db, user_id)
+        current = db.query(*_CALC_COLUMNS, *_SUM_COLUMNS).filter(
+            Shift.id.in_(results),
+        ).with_for_update().all()
+        fresh = [row for row in current if _inputs(row) == results[row.id][0]]
+        if fresh:
+            new_values = [results[row.id][1] for row in fresh]
+            # Removals read the stored values, so they go before the UPDATE.
+            remove_shifts(db, user_id, [row._asdict() for row in fresh])
+            updated = db.execute(_UPDATE_UNCHANGED, [
+                {"_id": row.id, "_date": row.date, "_start": row.start_time, "_end": row.end_time,
+                 "_pause": row.pause_min, **values}
+                for row, values in zip(fresh, new_values)
+            ]).rowcount
+            add_shifts(db, user_id, [{"date": row.date, **values} for row, values in zip(fresh, new_values)], plan)
+            record_changes(db, user_id, revision, upserted={SHIFT: [row.id for row in fresh]})
+            job.shifts_updated += updated
+            db.commit()
+        else:
+            db.rollback()       # all edited meanwhile; nothing to log
+    job.shifts_processed += len(chunk)
+    return chunk[-1].id
+
+
+def _recalculate_user(db: Session, job: RecalcJob, user_id: int):
+    plan = load_rate_plan(user_id, db)
+    locked = _locked_months(db, user_id)
+    last_id = 0
+    while True:
+        if _superseded(job):
+            job.state = "superseded"
+            return
+        last_id = _recalculate_chunk(db, job, user_id, plan, locked, last_id)
+        if last_id is None:
+            break
+
+    # Every shift outside the locked months is now on this plan, so their
+    # month aggregates can serve it again. Done under the same lock, so a
+    # concurrent writer cannot add a shift calculated under other settings.
+    bump_revision(db, user_id)
+    if not _superseded(job):
+        stamp_months(db, user_id, plan.version, exclude=locked)
+    db.commit()
+
+
+def run_job(job_id: str):
+    job = _jobs[job_id]
+    job.state = "running"
+    db = SessionLocal()
+    try:
+        shifts = db.query(Shift)
+        if job.user_id is not None:
+            user_ids: List[int] = [job.user_id]
+            shifts = shifts.filter(Shift.user_id == job.user_id)
+        else:
+            user_ids = [uid for (uid,) in db.query(User.id).order_by(User.id).all()]
+        job.users_total = len(user_ids)
+        job.shifts_total = shifts.count()
+        for uid in user_ids:
+            _recalculate_user(db, job, uid)
+            if job.state == "superseded":
+                break
+            job.users_done += 1
+        if job.state == "running":
+            job.state = "done"
+    except Exception as e:  # reported through the status endpoint
+        db.rollback()
+        job.state = "failed"
+        job.error = str(e)
+    finally:
+        db.close()
+        job.finished_at = datetime.now(timezone.utc).isoformat()
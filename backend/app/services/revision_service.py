@@ -0,0 +1,104 @@
+"""
+Per-user data revisions and the sync change log.
+
+Every write to a user's shifts, templates, wage settings, summaries or
+profile calls `bump_revision` inside its transaction, so the counter moves
+exactly when something a GET endpoint returns may have changed. Readers
+turn it into an ETag (see middleware/etag.py). The counter lives in the
+database, so all workers agree on it.
+
+Writers also pass the ids they created, changed or deleted. Each is stored
+in sync_changes with the new revision (deletes as tombstones), which is
+what GET /api/sync reads. The revision row is locked by the bump until the
+transaction commits, so a user's revisions commit in order and a client
+that has seen revision N has seen every change up to N. Writers that read
+rows before changing them bump first and pass the ids to `record_changes`
+later, so nothing they read can change before they commit.
+
+Each bump also increments the single data generation row (as does user
+deletion), which caches over all users key on. On PostgreSQL that row lock
+serialises writers across users until commit; SQLite does so anyway.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import upsert_insert
+from ..models.data_generation import DataGeneration
+from ..models.sync_change import SyncChange
+from ..models.user_revision import UserRevision
+
+# Entities reported by the sync feed.
+SHIFT = "shift"
+SHIFT_TEMPLATE = "shift_template"
+WAGE_SETTINGS = "wage_settings"
+MONTH_SUMMARY = "month_summary"
+
+_changes = SyncChange.__table__
+
+Changes = Optional[Dict[str, Iterable[int]]]
+
+
+def _bump_stmt(db: Session, values: list):
+    stmt = upsert_insert(db, UserRevision).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserRevision.user_id],
+        set_={"revision": UserRevision.revision + 1},
+    )
+
+
+def bump_generation(db: Session):
+    """Increment the data generation; for writes that bump no revision (user deletion). Does not commit."""
+    stmt = upsert_insert(db, DataGeneration).values(id=1, generation=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DataGeneration.id],
+        set_={"generation": DataGeneration.generation + 1},
+    ))
+
+
+def bump_revisions(db: Session, user_ids: Iterable[int]):
+    """Increment the users' revisions without recording entity changes; does not commit."""
+    ids = sorted(set(user_ids))
+    if ids:
+        db.execute(_bump_stmt(db, [{"user_id": uid, "revision": 1} for uid in ids]))
+        bump_generation(db)
+
+
+def bump_revision(db: Session, user_id: int, upserted: Changes = None, deleted: Changes = None) -> int:
+    """
+    Increment the user's revision and log the entities written under it,
+    e.g. upserted={SHIFT: [id, ...]}. Returns the new revision; does not commit.
+    """
+    stmt = _bump_stmt(db, [{"user_id": user_id, "revision": 1}]).returning(UserRevision.revision)
+    revision = db.execute(stmt).scalar_one()
+    bump_generation(db)
+    record_changes(db, user_id, revision, upserted, deleted)
+    return revision
+
+
+def record_changes(db: Session, user_id: int, revision: int, upserted: Changes = None, deleted: Changes = None):
+    """Log entities under a revision this transaction already bumped to."""
+    rows = [
+        {"user_id": user_id, "entity": entity, "entity_id": entity_id, "revision": revision, "deleted": gone}
+        for changes, gone in ((upserted, False), (deleted, True)) if changes
+        for entity, ids in changes.items()
+        for entity_id in ids
+    ]
+    if rows:
+        # One statement over all rows (executemany), compiled once per dialect.
+        stmt = upsert_insert(db, _changes)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[_changes.c.user_id, _changes.c.entity, _changes.c.entity_id],
+            set_={"revision": stmt.excluded.revision, "deleted": stmt.excluded.deleted},
+        ), rows)
+
+
+def current_generation(db: Session) -> int:
+    generation: Optional[int] = db.query(DataGeneration.generation).filter(DataGeneration.id == 1).scalar()
+    return generation or 0
+
+
+def current_revision(db: Session, user_id: int) -> int:
+    revision: Optional[int] = db.query(UserRevision.revision).filter(UserRevision.user_id == user_id).scalar()
+    return revision or 0
@@ -0,0 +1,251 @@
+"""
+Writing many shifts in one transaction.
+
+`apply_bulk` backs POST /api/shifts/bulk: a week of calendar edits arrives
+as one request instead of one call per shift. The rate plan is loaded once,
+the targeted shifts and templates are fetched with one query each, every new
+or changed shift is evaluated in a single batch-engine pass, and the
+aggregates get one removal and one addition delta for the whole request
+before a single commit.
+
+Items are validated up front. An item that cannot be applied (unknown id,
+bad time) is reported in its result and skipped; the rest are applied.
+
+`generate_rota` backs POST /api/shifts/rota: a repeating pattern of template
+codes is expanded over a date range, holidays are looked up in the holiday
+index in one call, pay is computed in one batch pass and the rows go in with
+one Core INSERT, so a year of shifts is a single short transaction.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.shift import Shift, shift_minutes
+from ..models.shift_template import ShiftTemplate
+from ..schemas.shift import RotaRequest, ShiftBulkItem, ShiftBulkRequest, ShiftBulkResult, ShiftOut
+from ..utils.parsing import canonical_time
+from ..utils.startup import lazy_module
+from .aggregate_service import add_shifts, remove_shifts
+from .holiday_service import holiday_flags, holiday_index
+from .revision_service import SHIFT, bump_revision, record_changes
+from .rate_plan import RatePlan, load_rate_plan
+from .wage_engine import calculate_shifts_batch
+
+np = lazy_module("numpy")
+
+_NOT_FOUND = "Vakt ikke funnet"
+_BAD_TIME = "Ugyldig klokkeslett"
+_DELETED = "Vakten slettes i samme forespørsel"
+
+
+def _time_error(values: Dict) -> bool:
+    return any(
+        values.get(k) is not None and canonical_time(values[k]) is None
+        for k in ("start_time", "end_time")
+    )
+
+
+def recalculate_all(shifts: List[Shift], plan: RatePlan):
+    """Set the calculated columns of every shift from one batch-engine pass."""
+    for shift, result in zip(shifts, calculate_shifts_batch(shifts, plan)):
+        for k, v in result.items():
+            setattr(shift, k, v)
+
+
+def apply_bulk(db: Session, user_id: int, data: ShiftBulkRequest) -> ShiftBulkResult:
+    plan = load_rate_plan(user_id, db)
+    results: List[ShiftBulkItem] = []
+
+    ids = set(data.delete) | {u.id for u in data.update}
+    existing: Dict[int, Shift] = {}
+    revision = None
+    if ids:
+        # Bump before reading, so the shifts cannot change until the commit.
+        revision = bump_revision(db, user_id)
+        existing = {
+            s.id: s
+            for s in db.query(Shift).filter(Shift.user_id == user_id, Shift.id.in_(ids)).all()
+        }
+
+    # Deletes
+    doomed: Dict[int, Shift] = {}
+    for i, shift_id in enumerate(data.delete):
+        shift = existing.get(shift_id)
+        if shift is None or shift_id in doomed:
+            results.append(ShiftBulkItem(op="delete", index=i, id=shift_id, ok=False, error=_NOT_FOUND))
+            continue
+        doomed[shift_id] = shift
+        results.append(ShiftBulkItem(op="delete", index=i, id=shift_id, ok=True))
+
+    # Updates: several items may target the same shift; they apply in order.
+    changes: List[Tuple[int, Shift, Dict]] = []
+    for i, item in enumerate(data.update):
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        shift = existing.get(item.id)
+        error = (
+            _NOT_FOUND if shift is None
+            else _DELETED if item.id in doomed
+            else _BAD_TIME if _time_error(values)
+            else None
+        )
+        if error:
+            results.append(ShiftBulkItem(op="update", index=i, id=item.id, ok=False, error=error))
+        else:
+            changes.append((i, shift, values))
+    changed = list({id(s): s for _, s, _ in changes}.values())
+
+    # Creates
+    valid_creates = []
+    for i, item in enumerate(data.create):
+        if _time_error(item.model_dump()):
+            results.append(ShiftBulkItem(op="create", index=i, ok=False, error=_BAD_TIME))
+        else:
+            valid_creates.append((i, item))
+    template_ids = {item.template_id for _, item in valid_creates if item.template_id}
+    template_pause = {}
+    if template_ids:
+        template_pause = dict(
+            db.query(ShiftTemplate.id, ShiftTemplate.pause_min).filter(ShiftTemplate.id.in_(template_ids)).all()
+        )
+    created: List[Tuple[int, Shift]] = []
+    for i, item in valid_creates:
+        shift = Shift(user_id=user_id, **item.model_dump())
+        # Template pause applies when none was given, as in POST /api/shifts.
+        if shift.pause_min == 0 and template_pause.get(item.template_id):
+            shift.pause_min = template_pause[item.template_id]
+        created.append((i, shift))
+
+    # Removals must see the stored values, so they go before any change.
+    if doomed or changed:
+        remove_shifts(db, user_id, list(doomed.values()) + changed)
+    for shift in doomed.values():
+        db.delete(shift)
+    for _, shift, values in changes:
+        for field, value in values.items():
+            setattr(shift, field, value)
+
+    new_shifts = [s for _, s in created]
+    recalculate_all(changed + new_shifts, plan)
+    db.add_all(new_shifts)
+    if changed or new_shifts:
+        add_shifts(db, user_id, changed + new_shifts, plan)
+    db.flush()
+    touched = doomed or changed or new_shifts
+    if touched:
+        if revision is None:
+            revision = bump_revision(db, user_id)
+        record_changes(db, user_id, revision, upserted={SHIFT: [s.id for s in changed + new_shifts]}, deleted={SHIFT: doomed})
+
+    # Serialise before the commit expires the objects.
+    for i, shift, _ in changes:
+        results.append(ShiftBulkItem(op="update", index=i, id=shift.id, ok=True,
+                                     shift=ShiftOut.model_validate(shift)))
+    for i, shift in created:
+        results.append(ShiftBulkItem(op="create", index=i, id=shift.id, ok=True,
+                                     shift=ShiftOut.model_validate(shift)))
+    if touched:
+        db.commit()
+    else:
+        db.rollback()       # nothing changed, so the revision stays put
+
+    order = {"create": 0, "update": 1, "delete": 2}
+    results.sort(key=lambda r: (order[r.op], r.index))
+    return ShiftBulkResult(
+        created=len(created),
+        updated=len(changes),
+        deleted=len(doomed),
+        failed=sum(not r.ok for r in results),
+        results=results,
+    )
+
+
+class RotaError(ValueError):
+    """The rota request cannot be expanded (message is user-facing)."""
+
+
+def _rota_templates(db: Session, user_id: int, codes: set) -> Dict[str, ShiftTemplate]:
+    templates: Dict[str, ShiftTemplate] = {}
+    rows = db.query(ShiftTemplate).filter(ShiftTemplate.user_id == user_id, ShiftTemplate.code.in_(codes))
+    for tpl in rows.order_by(ShiftTemplate.id):
+        templates.setdefault(tpl.code, tpl)
+    missing = sorted(codes - templates.keys())
+    if missing:
+        raise RotaError(f"Ukjent vaktkode: {', '.join(missing)}")
+    for tpl in templates.values():
+        if canonical_time(tpl.start_time) is None or canonical_time(tpl.end_time) is None:
+            raise RotaError(f"Ugyldig klokkeslett i vaktkode {tpl.code}")
+    return templates
+
+
+def generate_rota(db: Session, user_id: int, data: RotaRequest) -> Dict[str, Any]:
+    pattern = [(code or "").strip() or None for code in data.pattern]
+    templates = _rota_templates(db, user_id, {code for code in pattern if code})
+    cycle_start = (data.cycle_start or data.from_date).toordinal()
+
+    taken = set()
+    if data.skip_existing:
+        taken = {d for (d,) in db.query(Shift.date).filter(
+            Shift.user_id == user_id, Shift.date.between(data.from_date, data.to_date)
+        ).distinct()}
+
+    days: List[Tuple[date, ShiftTemplate]] = []
+    days_off = 0
+    skipped_existing: List[date] = []
+    for ordinal in range(data.from_date.toordinal(), data.to_date.toordinal() + 1):
+        code = pattern[(ordinal - cycle_start) % len(pattern)]
+        if code is None:
+            days_off += 1
+            continue
+        day = date.fromordinal(ordinal)
+        if day in taken:
+            skipped_existing.append(day)
+            continue
+        days.append((day, templates[code]))
+
+    flags = holiday_flags(np.fromiter((d.toordinal() for d, _ in days), dtype=np.int64, count=len(days)))
+    names = dict(holiday_index.between(data.from_date, data.to_date)) if flags.any() else {}
+    holidays = [
+        {"date": d, "code": tpl.code, "name": names.get(d), "skipped": data.holidays == "skip"}
+        for (d, tpl), flag in zip(days, flags.tolist()) if flag
+    ]
+    if data.holidays == "skip":
+        days = [day for day, flag in zip(days, flags.tolist()) if not flag]
+
+    plan = load_rate_plan(user_id, db)
+    shifts = [
+        Shift(user_id=user_id, template_id=tpl.id, date=d, start_time=tpl.start_time,
+              end_time=tpl.end_time, pause_min=tpl.pause_min or 0)
+        for d, tpl in days
+    ]
+    rows = []
+    for shift, values in zip(shifts, calculate_shifts_batch(shifts, plan)):
+        start_min, end_min = shift_minutes(shift.start_time, shift.end_time)
+        rows.append({
+            "user_id": user_id, "template_id": shift.template_id, "date": shift.date,
+            "start_time": shift.start_time, "end_time": shift.end_time, "pause_min": shift.pause_min,
+            "start_min": start_min, "end_min": end_min, **values,
+        })
+
+    if rows and not data.dry_run:
+        # Aggregates first: a month seeded from stored shifts must not see the new rows yet.
+        add_shifts(db, user_id, rows, plan)
+        ids = db.scalars(insert(Shift).returning(Shift.id), rows).all()
+        bump_revision(db, user_id, upserted={SHIFT: ids})
+        db.commit()
+
+    return {
+        "from_date": data.from_date,
+        "to_date": data.to_date,
+        "dry_run": data.dry_run,
+        "created": len(rows),
+        "days_off": days_off,
+        "skipped_existing": skipped_existing,
+        "holidays": holidays,
+        "total_hours": round(sum(r["total_hours"] for r in rows), 2),
+        "gross_pay": round(sum(r["gross_pay"] for r in rows), 2),
+    }
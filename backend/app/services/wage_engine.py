@@ -3,37 +3,54 @@ Wage calculation engine.
 
 Calculates hours split by type (base, evening, night, weekend, holiday,
 overtime) and the corresponding gross pay for a single shift, given a
-user's WageSettings.
+user's compiled RatePlan (see rate_plan.py). A WageSettings row is accepted
+as well and compiled through the plan cache.
+
+`calculate_shifts_batch` computes the same figures for many shifts at once
+using NumPy arrays, and is what month totals and imports go through.
+`calculate_period` covers arbitrary date ranges (year, YTD, pay periods).
 """
 
-from datetime import datetime, date, timedelta
-from typing import Dict
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Union
 
 from ..models.wage_settings import WageSettings
 from ..models.shift import Shift
-from ..utils.time_utils import shift_datetimes, overlap_minutes
-from .holiday_service import is_norwegian_holiday
+from ..utils.time_utils import (
+    MINUTES_PER_DAY, EVENING, NIGHT, WEEKEND, HOLIDAY,
+    shift_span, segment_shift, round_minutes,
+)
+from ..utils.parsing import CLOCK_MINUTES, clock_minutes, decode_date
+from .holiday_service import holiday_flags, holiday_index
+from .rate_plan import RatePlan, get_rate_plan
+from .calc_cache import shift_cache
+from ..utils.startup import lazy_module
+
+np = lazy_module("numpy")     # imported on the first calculation, not at startup
 
 
-def _allowance_kr(ws: WageSettings, atype: str, avalue: float, hours: float) -> float:
-    if atype == "kr":
-        return avalue * hours
-    else:  # percent
-        return ws.hourly_rate * (avalue / 100) * hours
+def _as_plan(plan: Union[RatePlan, WageSettings]) -> RatePlan:
+    return plan if isinstance(plan, RatePlan) else get_rate_plan(plan)
 
 
-def _window_datetimes(d: date, from_str: str, to_str: str):
-    """Return (start, end) window datetimes for a given date.
-    Handles cross-midnight windows (to_str <= from_str)."""
-    fmt = "%H:%M"
-    start = datetime.combine(d, datetime.strptime(from_str, fmt).time())
-    end = datetime.combine(d, datetime.strptime(to_str, fmt).time())
-    if end <= start:
-        end += timedelta(days=1)
-    return start, end
+def _day_flags(ordinal: int) -> int:
+    flags = WEEKEND if (ordinal - 1) % 7 >= 5 else 0  # weekday of a proleptic ordinal
+    if holiday_index.contains(ordinal):
+        flags |= HOLIDAY
+    return flags
 
 
-def calculate_shift(shift: Shift, ws: WageSettings) -> Dict[str, float]:
+def _full_or_clamped(minutes, worked, total_minutes):
+    """
+    Weekend/holiday minutes covering the whole worked span take the rounded
+    total; a partial overlap (shift crossing midnight) is clamped to it.
+    """
+    return total_minutes if minutes == worked else min(minutes, total_minutes)
+
+
+def calculate_shift(shift: Shift, plan: Union[RatePlan, WageSettings]) -> Dict[str, float]:
     """
     Calculate hours and pay for a single shift.
 
@@ -41,59 +58,64 @@ def calculate_shift(shift: Shift, ws: WageSettings) -> Dict[str, float]:
       total_hours, base_hours, evening_hours, night_hours,
       weekend_hours, holiday_hours, overtime_50_hours,
       overtime_100_hours, gross_pay, is_holiday
-    """
-    start, end = shift_datetimes(shift.date, shift.start_time, shift.end_time)
-    d = datetime.strptime(shift.date, "%Y-%m-%d").date()
 
-    pause_min = shift.pause_min or 0
-    if not ws.paid_pause:
-        effective_end = end - timedelta(minutes=pause_min)
+    Results are memoized per shift shape and plan version (see calc_cache).
+    """
+    plan = _as_plan(plan)
+    day, start, end = shift_span(shift.date, shift.start_time, shift.end_time)
+    is_sunday = (day - 1) % 7 == 6  # weekday of a proleptic ordinal
+    key = (plan.version, is_sunday, _day_flags(day), _day_flags(day + 1), start, end, shift.pause_min or 0)
+    result = shift_cache.get(key)
+    if result is None:
+        result = _calculate_shape(plan, *key[1:])
+        shift_cache.put(key, result)
+    return dict(result)
+
+
+def _calculate_shape(
+    plan: RatePlan, is_sunday: bool, flags_0: int, flags_1: int, start: int, end: int, pause_min: int,
+) -> Dict[str, float]:
+    if not plan.paid_pause:
+        effective_end = end - pause_min
     else:
         effective_end = end
 
-    total_minutes = max(0.0, (effective_end - start).total_seconds() / 60)
+    worked = max(0, effective_end - start)
+    total_minutes = worked
 
     # Rounding
-    if ws.rounding_minutes > 0:
-        from ..utils.time_utils import round_minutes
-        total_minutes = round_minutes(total_minutes, ws.rounding_minutes, ws.rounding_method)
+    if plan.rounding_minutes > 0:
+        total_minutes = round_minutes(total_minutes, plan.rounding_minutes, plan.rounding_method)
 
     total_hours = total_minutes / 60
-    is_holiday = is_norwegian_holiday(d)
-    is_saturday = d.weekday() == 5
-    is_sunday = d.weekday() == 6
+    is_holiday = bool(flags_0 & HOLIDAY)
 
     # --- Segment analysis ---
-    evening_min = 0.0
-    night_min = 0.0
-
-    if ws.evening_allowance_value > 0:
-        e_start, e_end = _window_datetimes(d, ws.evening_from, ws.evening_to)
-        evening_min += overlap_minutes(start, effective_end, e_start, e_end)
-        # also check next day window
-        e_start2, e_end2 = _window_datetimes(d + timedelta(days=1), ws.evening_from, ws.evening_to)
-        evening_min += overlap_minutes(start, effective_end, e_start2, e_end2)
-
-    if ws.night_allowance_value > 0:
-        n_start, n_end = _window_datetimes(d, ws.night_from, ws.night_to)
-        night_min += overlap_minutes(start, effective_end, n_start, n_end)
-        n_start2, n_end2 = _window_datetimes(d + timedelta(days=1), ws.night_from, ws.night_to)
-        night_min += overlap_minutes(start, effective_end, n_start2, n_end2)
+    windows = {}
+    if plan.evening_window:
+        windows[EVENING] = plan.evening_window
+    if plan.night_window:
+        windows[NIGHT] = plan.night_window
+
+    minutes = {EVENING: 0, NIGHT: 0, WEEKEND: 0, HOLIDAY: 0}
+    for seg_start, seg_end, flags in segment_shift(start, effective_end, windows, (flags_0, flags_1)):
+        for flag in minutes:
+            if flags & flag:
+                minutes[flag] += seg_end - seg_start
 
     # Clamp to total
-    evening_min = min(evening_min, total_minutes)
-    night_min = min(night_min, total_minutes)
-
-    weekend_hours = total_hours if (is_saturday or is_sunday) else 0.0
-    holiday_hours = total_hours if is_holiday else 0.0
+    evening_min = min(minutes[EVENING], total_minutes)
+    night_min = min(minutes[NIGHT], total_minutes)
+    weekend_hours = _full_or_clamped(minutes[WEEKEND], worked, total_minutes) / 60 if minutes[WEEKEND] else 0.0
+    holiday_hours = _full_or_clamped(minutes[HOLIDAY], worked, total_minutes) / 60 if minutes[HOLIDAY] else 0.0
 
     # Base hours = total minus overtime (calculated below)
     # Overtime: daily threshold
     ot_50_h = 0.0
     ot_100_h = 0.0
 
-    if total_hours > ws.overtime_daily_threshold:
-        excess = total_hours - ws.overtime_daily_threshold
+    if total_hours > plan.overtime_daily_threshold:
+        excess = total_hours - plan.overtime_daily_threshold
         if is_holiday or is_sunday:
             ot_100_h = excess
         else:
@@ -102,24 +124,24 @@ def calculate_shift(shift: Shift, ws: WageSettings) -> Dict[str, float]:
     base_hours = total_hours - ot_50_h - ot_100_h
 
     # --- Pay calculation ---
-    base_pay = base_hours * ws.hourly_rate
+    base_pay = base_hours * plan.hourly_rate
 
     evening_hours_val = evening_min / 60
     night_hours_val = night_min / 60
 
-    evening_pay = _allowance_kr(ws, ws.evening_allowance_type, ws.evening_allowance_value, evening_hours_val)
-    night_pay = _allowance_kr(ws, ws.night_allowance_type, ws.night_allowance_value, night_hours_val)
+    evening_pay = plan.evening_kr * evening_hours_val
+    night_pay = plan.night_kr * night_hours_val
 
     weekend_pay = 0.0
     if weekend_hours > 0:
-        weekend_pay = _allowance_kr(ws, ws.weekend_allowance_type, ws.weekend_allowance_value, weekend_hours)
+        weekend_pay = plan.weekend_kr * weekend_hours
 
     holiday_pay_add = 0.0
     if holiday_hours > 0:
-        holiday_pay_add = _allowance_kr(ws, ws.holiday_allowance_type, ws.holiday_allowance_value, holiday_hours)
+        holiday_pay_add = plan.holiday_kr * holiday_hours
 
-    ot_50_pay = ot_50_h * ws.hourly_rate * ws.overtime_50_rate
-    ot_100_pay = ot_100_h * ws.hourly_rate * ws.overtime_100_rate
+    ot_50_pay = ot_50_h * plan.hourly_rate * plan.overtime_50_rate
+    ot_100_pay = ot_100_h * plan.hourly_rate * plan.overtime_100_rate
 
     gross_pay = base_pay + evening_pay + night_pay + weekend_pay + holiday_pay_add + ot_50_pay + ot_100_pay
 
@@ -137,44 +159,242 @@ def calculate_shift(shift: Shift, ws: WageSettings) -> Dict[str, float]:
     }
 
 
-def calculate_month(shifts: list, ws: WageSettings) -> Dict[str, float]:
-    """Aggregate all shifts in a month and compute totals including weekly OT."""
-    totals = {
-        "total_hours": 0.0,
-        "base_hours": 0.0,
-        "evening_hours": 0.0,
-        "night_hours": 0.0,
-        "weekend_hours": 0.0,
-        "holiday_hours": 0.0,
-        "overtime_50_hours": 0.0,
-        "overtime_100_hours": 0.0,
-        "gross_pay": 0.0,
+_RESULT_KEYS = (
+    "total_hours", "base_hours", "evening_hours", "night_hours", "weekend_hours",
+    "holiday_hours", "overtime_50_hours", "overtime_100_hours",
+)
+
+
+def _clock_array(values: List[str]) -> np.ndarray:
+    """Minute-of-day for each HH:MM string, via the precomputed table."""
+    try:
+        return np.fromiter((CLOCK_MINUTES[v] for v in values), dtype=np.int64, count=len(values))
+    except KeyError:  # non-canonical strings such as "8:00"
+        parsed = {v: clock_minutes(v) for v in set(values)}
+        return np.fromiter((parsed[v] for v in values), dtype=np.int64, count=len(values))
+
+
+def _day_arrays(values: List[str]):
+    """Return (ordinal, iso_week) arrays for YYYY-MM-DD strings."""
+    days = [decode_date(v) for v in values]
+    ordinal = np.fromiter((d.ordinal for d in days), dtype=np.int64, count=len(days))
+    week = np.fromiter((d.iso_week for d in days), dtype=np.int64, count=len(days))
+    return ordinal, week
+
+
+def _flag_arrays(ordinal: np.ndarray) -> np.ndarray:
+    """WEEKEND/HOLIDAY flags per day ordinal."""
+    flags = np.where((ordinal - 1) % 7 >= 5, WEEKEND, 0)
+    return flags | np.where(holiday_flags(ordinal), HOLIDAY, 0)
+
+
+def _overlap(a_start: np.ndarray, a_end: np.ndarray, b_start: int, b_end: int) -> np.ndarray:
+    return np.maximum(0, np.minimum(a_end, b_end) - np.maximum(a_start, b_start))
+
+
+def _window_overlap(start: np.ndarray, end: np.ndarray, window) -> np.ndarray:
+    """Minutes inside a daily window opened the day before, on, or after the shift day."""
+    w_from, w_to = window
+    total = np.zeros(len(start), dtype=np.int64)
+    for k in (-1, 0, 1):
+        offset = k * MINUTES_PER_DAY
+        total += _overlap(start, end, w_from + offset, w_to + offset)
+    return total
+
+
+def _prepare_batch(shifts: list) -> Dict[str, np.ndarray]:
+    """
+    Parse shifts into arrays once. Rows are reduced to their distinct shapes
+    (Sunday flag, day flags of the shift day and the next, start, end,
+    pause), which is all the calculation depends on; repetitive rotas
+    collapse to a handful of rows. `inverse` maps each shift to its shape.
+    """
+    n = len(shifts)
+    start = _clock_array([s.start_time for s in shifts])
+    end = _clock_array([s.end_time for s in shifts])
+    end = np.where(end <= start, end + MINUTES_PER_DAY, end)
+    day, week = _day_arrays([s.date for s in shifts])
+    pause = np.fromiter((s.pause_min or 0 for s in shifts), dtype=np.int64, count=n)
+    is_sunday = ((day - 1) % 7 == 6).astype(np.int64)  # weekday of a proleptic ordinal
+
+    columns = np.stack([is_sunday, _flag_arrays(day), _flag_arrays(day + 1), start, end, pause], axis=1)
+    shapes, inverse = np.unique(columns, axis=0, return_inverse=True)
+    return {"shapes": shapes, "inverse": inverse.reshape(n), "iso_week": week}
+
+
+def _evaluate_shapes(shapes: np.ndarray, plan: RatePlan) -> Dict[str, np.ndarray]:
+    """
+    Vectorized counterpart of `_calculate_shape`, one row per shape.
+
+    Minute counts are integers, and every float step mirrors the scalar
+    code in the same order, so the unrounded values are bit-for-bit
+    identical.
+    """
+    n = len(shapes)
+    is_sunday = shapes[:, 0].astype(bool)
+    flags_0 = shapes[:, 1]
+    flags_1 = shapes[:, 2]
+    start = shapes[:, 3]
+    end = shapes[:, 4]
+    pause = shapes[:, 5]
+    effective_end = end if plan.paid_pause else end - pause
+
+    worked = np.maximum(0, effective_end - start)
+    total_minutes = worked.astype(np.float64)
+    if plan.rounding_minutes > 0:
+        unit = plan.rounding_minutes
+        if plan.rounding_method == "up":
+            total_minutes = np.ceil(total_minutes / unit) * unit
+        elif plan.rounding_method == "down":
+            total_minutes = np.floor(total_minutes / unit) * unit
+        else:
+            total_minutes = np.rint(total_minutes / unit) * unit
+    total_hours = total_minutes / 60
+
+    evening_min = np.zeros(n)
+    night_min = np.zeros(n)
+    if plan.evening_window:
+        evening_min = _window_overlap(start, effective_end, plan.evening_window).astype(np.float64)
+    if plan.night_window:
+        night_min = _window_overlap(start, effective_end, plan.night_window).astype(np.float64)
+    evening_min = np.minimum(evening_min, total_minutes)
+    night_min = np.minimum(night_min, total_minutes)
+
+    on_day_0 = _overlap(start, effective_end, 0, MINUTES_PER_DAY)
+    on_day_1 = _overlap(start, effective_end, MINUTES_PER_DAY, 2 * MINUTES_PER_DAY)
+
+    def flagged_hours(flag):
+        m = np.where(flags_0 & flag, on_day_0, 0) + np.where(flags_1 & flag, on_day_1, 0)
+        full = np.where(m == worked, total_minutes, np.minimum(m, total_minutes))
+        return np.where(m > 0, full / 60, 0.0)
+
+    weekend_hours = flagged_hours(WEEKEND)
+    holiday_hours = flagged_hours(HOLIDAY)
+    is_holiday = (flags_0 & HOLIDAY) > 0
+
+    has_ot = total_hours > plan.overtime_daily_threshold
+    excess = total_hours - plan.overtime_daily_threshold
+    ot_100 = has_ot & (is_holiday | is_sunday)
+    ot_50_h = np.where(has_ot & ~ot_100, excess, 0.0)
+    ot_100_h = np.where(ot_100, excess, 0.0)
+    base_hours = total_hours - ot_50_h - ot_100_h
+
+    evening_hours = evening_min / 60
+    night_hours = night_min / 60
+
+    base_pay = base_hours * plan.hourly_rate
+    evening_pay = plan.evening_kr * evening_hours
+    night_pay = plan.night_kr * night_hours
+    weekend_pay = np.where(weekend_hours > 0, plan.weekend_kr * weekend_hours, 0.0)
+    holiday_pay_add = np.where(holiday_hours > 0, plan.holiday_kr * holiday_hours, 0.0)
+    ot_50_pay = ot_50_h * plan.hourly_rate * plan.overtime_50_rate
+    ot_100_pay = ot_100_h * plan.hourly_rate * plan.overtime_100_rate
+
+    gross_pay = base_pay + evening_pay + night_pay + weekend_pay + holiday_pay_add + ot_50_pay + ot_100_pay
+
+    return {
+        "total_hours": total_hours,
+        "base_hours": base_hours,
+        "evening_hours": evening_hours,
+        "night_hours": night_hours,
+        "weekend_hours": weekend_hours,
+        "holiday_hours": holiday_hours,
+        "overtime_50_hours": ot_50_h,
+        "overtime_100_hours": ot_100_h,
+        "gross_pay": gross_pay,
+        "is_holiday": is_holiday,
     }
 
+
+def _result_rows(arrays: Dict[str, np.ndarray]) -> List[Dict[str, float]]:
+    """Round the evaluated arrays into per-shift dicts, exactly like `calculate_shift`."""
+    columns = [arrays[k].tolist() for k in _RESULT_KEYS]
+    gross = arrays["gross_pay"].tolist()
+    holiday = arrays["is_holiday"].tolist()
+    return [
+        {
+            **{k: round(col[i], 4) for k, col in zip(_RESULT_KEYS, columns)},
+            "gross_pay": round(gross[i], 2),
+            "is_holiday": holiday[i],
+        }
+        for i in range(len(gross))
+    ]
+
+
+def calculate_shifts_batch(shifts: list, plan: Union[RatePlan, WageSettings]) -> List[Dict[str, float]]:
+    """
+    Calculate hours and pay for many shifts in one vectorized pass.
+
+    Returns one dict per shift, in input order, identical to what
+    `calculate_shift` returns for that shift.
+    """
+    batch = _prepare_batch(shifts)
+    rows = _result_rows(_evaluate_shapes(batch["shapes"], _as_plan(plan)))
+    return [dict(rows[i]) for i in batch["inverse"].tolist()]
+
+
+MONTH_SUM_KEYS = _RESULT_KEYS + ("gross_pay",)
+
+
+def calculate_month(shifts: list, plan: Union[RatePlan, WageSettings]) -> Dict[str, float]:
+    """Aggregate all shifts in a month and compute totals including weekly OT."""
+    return _month_from_batch(_prepare_batch(shifts), _as_plan(plan))
+
+
+def simulate_month(shifts: list, plans: List[RatePlan]) -> List[Dict[str, float]]:
+    """
+    Month totals of the same shifts under several rate plans. The shifts are
+    parsed and reduced to shapes once; only the arithmetic runs per plan.
+    """
+    batch = _prepare_batch(shifts)
+    return [_month_from_batch(batch, plan) for plan in plans]
+
+
+def _month_from_batch(batch: Dict[str, np.ndarray], plan: RatePlan) -> Dict[str, float]:
+    totals = {key: 0.0 for key in MONTH_SUM_KEYS}
+
     # Group shifts by ISO week for weekly OT check
     week_hours: Dict[int, float] = {}
 
-    for shift in shifts:
-        result = calculate_shift(shift, ws)
+    rows = _result_rows(_evaluate_shapes(batch["shapes"], plan))
+    results = [rows[i] for i in batch["inverse"].tolist()]
+    weeks = batch["iso_week"].tolist()
+    for result, week in zip(results, weeks):
         for key in totals:
             totals[key] += result[key]
-        d = datetime.strptime(shift.date, "%Y-%m-%d").date()
-        week = d.isocalendar()[1]
         week_hours[week] = week_hours.get(week, 0.0) + result["total_hours"]
 
+    return month_totals(totals, week_hours, plan)
+
+
+def month_totals(totals: Dict[str, float], week_hours: Dict, plan: RatePlan) -> Dict[str, float]:
+    """
+    Finish a month from summed per-shift values and per-ISO-week hours:
+    weekly overtime, tax and holiday pay. Shared by `calculate_month` and
+    the stored month aggregates.
+    """
+    totals = dict(totals)
+
     # Weekly OT adjustments
     for week, hours in week_hours.items():
-        if hours > ws.overtime_weekly_threshold:
-            extra = hours - ws.overtime_weekly_threshold
-            totals["overtime_50_hours"] += extra
-            totals["base_hours"] = max(0.0, totals["base_hours"] - extra)
-            totals["gross_pay"] += extra * ws.hourly_rate * (ws.overtime_50_rate - 1)
+        if hours > plan.overtime_weekly_threshold:
+            _add_weekly_overtime(totals, hours - plan.overtime_weekly_threshold, plan)
+
+    return _finish_totals(totals, plan)
+
 
+def _add_weekly_overtime(totals: Dict[str, float], extra: float, plan: RatePlan):
+    totals["overtime_50_hours"] += extra
+    totals["base_hours"] = max(0.0, totals["base_hours"] - extra)
+    totals["gross_pay"] += extra * plan.hourly_rate * (plan.overtime_50_rate - 1)
+
+
+def _finish_totals(totals: Dict[str, float], plan: RatePlan) -> Dict[str, float]:
     gross = totals["gross_pay"]
-    tax = round(gross * ws.tax_percent / 100, 2)
+    tax = round(gross * plan.tax_percent / 100, 2)
     net = round(gross - tax, 2)
     holiday_pay_base = gross
-    holiday_pay_earned = round(gross * ws.holiday_pay_percent / 100, 2)
+    holiday_pay_earned = round(gross * plan.holiday_pay_percent / 100, 2)
 
     return {
         **{k: round(v, 4) for k, v in totals.items()},
@@ -183,3 +403,100 @@ def calculate_month(shifts: list, ws: WageSettings) -> Dict[str, float]:
         "holiday_pay_base": round(holiday_pay_base, 2),
         "holiday_pay_earned": holiday_pay_earned,
     }
+
+
+_PERIOD_CHUNK = 2000
+_MONEY_KEYS = ("gross_pay", "tax_deduction", "net_pay", "holiday_pay_base", "holiday_pay_earned")
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def calculate_period(shifts: Iterable, plan: Union[RatePlan, WageSettings], start: Union[str, date]) -> Dict:
+    """
+    Totals for an arbitrary date range in one pass over shifts sorted by date.
+
+    Weekly overtime uses rolling (iso_year, iso_week) buckets, so a week that
+    spans two months is one week; the hours over the weekly threshold are
+    booked on the month of the shift that crossed it. Shifts dated before
+    `start` only fill their week's bucket: pass shifts from the Monday of
+    start's week so a period that begins mid-week sees the whole week.
+
+    Returns period totals plus per-month and per-ISO-week breakdowns. Each
+    month gets its own tax and holiday pay, as a saved month would.
+    """
+    plan = _as_plan(plan)
+    threshold = plan.overtime_weekly_threshold
+    start_ordinal = decode_date(start).ordinal
+    keys: Dict[str, tuple] = {}
+    months: Dict[tuple, Dict[str, float]] = {}
+    month_overtime: Dict[tuple, Dict[tuple, float]] = {}   # month -> week -> extra hours
+    weeks: Dict[tuple, Dict[str, float]] = {}
+    week_running: Dict[tuple, float] = {}
+    last_date = None
+
+    for chunk in _chunked(shifts, _PERIOD_CHUNK):
+        batch = _prepare_batch(chunk)
+        rows = _result_rows(_evaluate_shapes(batch["shapes"], plan))
+        for shift, i in zip(chunk, batch["inverse"].tolist()):
+            result = rows[i]
+            key = keys.get(shift.date)
+            if key is None:
+                d = decode_date(shift.date)
+                key = keys[shift.date] = (d.year, d.month, d.iso_year, d.iso_week, d.ordinal)
+            mkey, wkey = key[:2], key[2:4]
+
+            before = week_running.get(wkey, 0.0)
+            after = week_running[wkey] = before + result["total_hours"]
+            if key[4] < start_ordinal:
+                continue
+            extra = max(0.0, after - threshold) - max(0.0, before - threshold)
+
+            month = months.get(mkey)
+            if month is None:
+                month = months[mkey] = {"shifts_count": 0, "days_worked": 0, **{k: 0.0 for k in MONTH_SUM_KEYS}}
+            month["shifts_count"] += 1
+            if shift.date != last_date:
+                month["days_worked"] += 1
+                last_date = shift.date
+            for k in MONTH_SUM_KEYS:
+                month[k] += result[k]
+
+            week = weeks.get(wkey)
+            if week is None:
+                week = weeks[wkey] = {"shifts_count": 0, "total_hours": 0.0, "overtime_50_hours": 0.0}
+            week["shifts_count"] += 1
+            week["total_hours"] += result["total_hours"]
+            if extra:
+                week["overtime_50_hours"] += extra
+                per_week = month_overtime.setdefault(mkey, {})
+                per_week[wkey] = per_week.get(wkey, 0.0) + extra
+
+    month_rows = []
+    period = {"shifts_count": 0, "days_worked": 0, **{k: 0.0 for k in MONTH_SUM_KEYS + _MONEY_KEYS[1:]}}
+    for (year, month_no), month in sorted(months.items()):
+        counts = {"shifts_count": month.pop("shifts_count"), "days_worked": month.pop("days_worked")}
+        for extra in month_overtime.get((year, month_no), {}).values():
+            _add_weekly_overtime(month, extra, plan)
+        row = {"year": year, "month": month_no, **counts, **_finish_totals(month, plan)}
+        month_rows.append(row)
+        for k in period:
+            period[k] += row[k]
+
+    return {
+        **{k: round(v, 2 if k in _MONEY_KEYS else 4) if isinstance(v, float) else v for k, v in period.items()},
+        "months": month_rows,
+        "weeks": [
+            {"iso_year": y, "iso_week": w, "shifts_count": v["shifts_count"],
+             "total_hours": round(v["total_hours"], 4), "overtime_50_hours": round(v["overtime_50_hours"], 4)}
+            for (y, w), v in sorted(weeks.items())
+        ],
+    }
@@ -0,0 +1,69 @@
+"""
+Fast parsing of the shift string fields.
+
+Shift times are HH:MM strings and dates arrive as YYYY-MM-DD strings (API,
+imports), and every calculation used to run them through `datetime.strptime`. Times are looked
+up in a table of all 1440 canonical HH:MM strings; dates are decoded once
+and cached. Non-canonical input (e.g. "8:00" or "2024-5-1", which strptime
+accepts) falls back to strptime, so behaviour is unchanged.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Union
+
+CLOCK_MINUTES: Dict[str, int] = {f"{m // 60:02d}:{m % 60:02d}": m for m in range(24 * 60)}
+CLOCK_STRINGS = tuple(CLOCK_MINUTES)        # minute of day -> "HH:MM"
+
+
+class DayInfo(NamedTuple):
+    ordinal: int        # date.toordinal()
+    year: int
+    month: int
+    weekday: int        # Monday = 0
+    iso_year: int
+    iso_week: int
+
+
+def clock_minutes(time_str: str) -> int:
+    """Minute of day for an HH:MM string."""
+    m = CLOCK_MINUTES.get(time_str)
+    if m is None:
+        t = datetime.strptime(time_str, "%H:%M")
+        m = t.hour * 60 + t.minute
+    return m
+
+
+def canonical_time(time_str: str) -> Optional[str]:
+    """The HH:MM form of a time string, or None if it is not H:MM/HH:MM."""
+    if time_str in CLOCK_MINUTES:
+        return time_str
+    try:
+        return CLOCK_STRINGS[clock_minutes(time_str)]
+    except ValueError:
+        return None
+
+
+def _parse_date(date_str) -> date:
+    if isinstance(date_str, date):
+        return date_str
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-" and date_str.replace("-", "").isdigit():
+        return date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:]))
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+@lru_cache(maxsize=65536)
+def decode_date(date_str: Union[str, date]) -> DayInfo:
+    """Ordinal, calendar and ISO-week fields of a date or YYYY-MM-DD string (cached)."""
+    d = _parse_date(date_str)
+    iso_year, iso_week, _ = d.isocalendar()
+    return DayInfo(d.toordinal(), d.year, d.month, d.weekday(), iso_year, iso_week)
+
+
+def day_ordinal(date_str: Union[str, date]) -> int:
+    """Proleptic Gregorian ordinal (date.toordinal) of a date or YYYY-MM-DD string."""
+    return decode_date(date_str).ordinal
+
+
+def parse_date(date_str: Union[str, date]) -> date:
+    return date.fromordinal(decode_date(date_str).ordinal)
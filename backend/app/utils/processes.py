@@ -0,0 +1,23 @@
+"""
+Process pools started from the web server.
+
+The server process already runs threads (the threadpool, aiosqlite
+connections, the principal-bus poller), and forking a multithreaded
+process can leave a child blocked on a lock that was held at fork time.
+Pools are therefore created with the forkserver start method (spawn where
+that is unavailable): workers fork from a clean single-threaded server
+process, and their arguments and results are pickled as before.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """A ProcessPoolExecutor whose workers are not forked from this process."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_context())
@@ -1,19 +1,38 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 from ..config import settings
 from ..schemas.auth import TokenData
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    # Deferred: passlib is only needed where passwords are hashed, which is
+    # the password pool's worker processes rather than the web workers.
+    from passlib.context import CryptContext
+
+    # Hashes at any other cost than BCRYPT_ROUNDS report needs_update, so
+    # they are rehashed on the next successful login.
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return pwd_context().verify(plain, hashed)
+
+
+def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new hash or None); a new hash is returned when the cost has changed."""
+    return pwd_context().verify_and_update(plain, hashed)
 
 
 def create_access_token(user_id: int, is_admin: bool, expires_delta: Optional[timedelta] = None) -> str:
@@ -21,10 +40,14 @@ def create_access_token(user_id: int, is_admin: bool, expires_delta: Optional[ti
         expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     payload = {"sub": str(user_id), "is_admin": is_admin, "exp": expire}
+    from jose import jwt  # deferred until the first login/request
+
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
 def decode_token(token: str) -> Optional[TokenData]:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id = int(payload.get("sub"))
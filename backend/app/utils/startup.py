@@ -0,0 +1,89 @@
+"""
+Cold-start bookkeeping: phase timings and deferred imports.
+
+`app.main` imports this first, so `startup_timings.origin` is as close to
+the start of the app import as we can get. Phases are recorded as they run
+and reported by GET /api/admin/metrics/startup.
+
+`lazy_module` returns a stand-in that imports the real module on first
+attribute access, for heavy dependencies (numpy, passlib, jose) that most
+workers need only once the first request arrives. The time each one takes
+is recorded under `lazy_imports`.
+"""
+
+import importlib
+import os
+import threading
+import time
+import types
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class StartupTimings:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self._open: Dict[str, float] = {}
+        self.lazy_imports: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.mode: Optional[str] = None
+
+    def begin(self, name: str):
+        self._open[name] = time.perf_counter()
+
+    def end(self, name: str):
+        self.phases[name] = round((time.perf_counter() - self._open.pop(name)) * 1000, 3)
+
+    @contextmanager
+    def phase(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def ready(self, mode: str):
+        self.mode = mode
+        self.ready_ms = round((time.perf_counter() - self.origin) * 1000, 3)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "mode": self.mode,
+            "ready_ms": self.ready_ms,
+            "phases": dict(self.phases),
+            "lazy_imports": dict(self.lazy_imports),
+        }
+
+
+startup_timings = StartupTimings()
+
+
+class _LazyModule(types.ModuleType):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lock"] = threading.Lock()
+        self.__dict__["_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        with self._lock:
+            if self._module is None:
+                t0 = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                startup_timings.lazy_imports[self.__name__] = round((time.perf_counter() - t0) * 1000, 3)
+                # Copy the namespace so later lookups are plain attribute hits.
+                self.__dict__.update({k: v for k, v in vars(module).items() if k != "__name__"})
+                self.__dict__["_module"] = module
+            return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name: str) -> types.ModuleType:
+    """A module object that imports `name` on first attribute access."""
+    return _LazyModule(name)
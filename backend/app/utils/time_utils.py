@@ -1,12 +1,21 @@
-from datetime import datetime, date, timedelta
-from typing import Tuple
+from datetime import datetime, date, time, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from .parsing import clock_minutes, day_ordinal, parse_date  # noqa: F401 (re-exported)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Segment type flags. A segment can carry several (e.g. a Saturday evening).
+EVENING = 1
+NIGHT = 2
+WEEKEND = 4
+HOLIDAY = 8
 
 
 def parse_time(date_str: str, time_str: str) -> datetime:
     """Combine a date string (YYYY-MM-DD) and time string (HH:MM) into a datetime."""
-    d = datetime.strptime(date_str, "%Y-%m-%d").date()
-    t = datetime.strptime(time_str, "%H:%M").time()
-    return datetime.combine(d, t)
+    minutes = clock_minutes(time_str)
+    return datetime.combine(parse_date(date_str), time(minutes // 60, minutes % 60))
 
 
 def shift_datetimes(date_str: str, start_str: str, end_str: str) -> Tuple[datetime, datetime]:
@@ -18,12 +27,83 @@ def shift_datetimes(date_str: str, start_str: str, end_str: str) -> Tuple[dateti
     return start, end
 
 
-def overlap_minutes(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> float:
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    """First and last day of a month, for indexed range queries on Shift.date."""
+    first = date(year, month, 1)
+    return first, date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def shift_span(date_str: str, start_str: str, end_str: str) -> Tuple[int, int, int]:
+    """
+    Return (day_ordinal, start, end) for a shift, with start/end in minutes
+    since midnight of that day. A shift ending at or before its start time
+    crosses midnight, so end may be up to 2 * MINUTES_PER_DAY.
+    """
+    start = clock_minutes(start_str)
+    end = clock_minutes(end_str)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return day_ordinal(date_str), start, end
+
+
+def overlap(a_start: int, a_end: int, b_start: int, b_end: int) -> int:
     """Return the number of minutes the two intervals overlap."""
-    latest_start = max(a_start, b_start)
-    earliest_end = min(a_end, b_end)
-    delta = (earliest_end - latest_start).total_seconds() / 60
-    return max(0.0, delta)
+    return max(0, min(a_end, b_end) - max(a_start, b_start))
+
+
+def segment_shift(
+    start: int,
+    end: int,
+    windows: Dict[int, Tuple[int, int]],
+    day_flags: Sequence[int],
+) -> List[Tuple[int, int, int]]:
+    """
+    Split [start, end) into typed segments with a single sweep.
+
+    `windows` maps a flag (EVENING, NIGHT) to a daily (from, to) window in
+    minutes, with to > from for windows that cross midnight. The window is
+    repeated for the previous day, the shift day and the next day, so early
+    morning minutes are covered by the window opened the evening before.
+    `day_flags[k]` holds the WEEKEND/HOLIDAY flags of day k after the shift
+    day. Returns (seg_start, seg_end, flags) tuples covering [start, end);
+    segments with no flags are plain base time.
+    """
+    if end <= start:
+        return []
+    events: List[Tuple[int, int, int]] = []
+    for flag, (w_from, w_to) in windows.items():
+        for k in (-1, 0, 1):
+            offset = k * MINUTES_PER_DAY
+            events.append((w_from + offset, 1, flag))
+            events.append((w_to + offset, -1, flag))
+    for k, flags in enumerate(day_flags):
+        if flags:
+            events.append((k * MINUTES_PER_DAY, 1, flags))
+            events.append(((k + 1) * MINUTES_PER_DAY, -1, flags))
+    events.sort()
+
+    active: Dict[int, int] = {}
+    segments: List[Tuple[int, int, int]] = []
+    pos = start
+    i = 0
+    while True:
+        next_pos = events[i][0] if i < len(events) else end
+        if next_pos > pos:
+            seg_end = min(next_pos, end)
+            flags = 0
+            for flag, count in active.items():
+                if count > 0:
+                    flags |= flag
+            segments.append((pos, seg_end, flags))
+            pos = seg_end
+            if pos >= end:
+                break
+        if i >= len(events):
+            break
+        _, delta, flag = events[i]
+        active[flag] = active.get(flag, 0) + delta
+        i += 1
+    return segments
 
 
 def is_weekend(dt: datetime) -> bool:
@@ -0,0 +1,106 @@
+"""
+Benchmark runner.
+
+    cd backend
+    python -m benchmarks                                  # engine, api and startup suites
+    python -m benchmarks --suite engine --sizes 1,1000,100000
+    python -m benchmarks --suite db --db-writers 8 --db-readers 4 --db-seconds 5
+    python -m benchmarks --out results.json --check benchmarks/thresholds.json
+
+The db suite is a concurrent load test of the database profiles and only
+runs when asked for. Results are written as JSON. With --check, every result whose key appears
+in the thresholds file is compared against its limits, and the exit status
+is 1 if any is exceeded, so a release job can gate on it.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+
+def _sizes(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def check(results, thresholds) -> list:
+    """Return one message per result that exceeds its threshold."""
+    failures = []
+    for r in results:
+        limits = thresholds.get(r["key"])
+        if not limits:
+            continue
+        for metric, limit in limits.items():
+            if r[metric] is not None and r[metric] > limit:
+                failures.append(f"{r['key']}: {metric} {r[metric]} > {limit}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--suite", choices=["engine", "api", "db", "startup", "all"], default="all")
+    parser.add_argument("--sizes", type=_sizes, default=[1, 1000, 10000, 100000], help="Engine input sizes")
+    parser.add_argument("--api-sizes", type=_sizes, default=[1000, 10000], help="Shifts in the database")
+    parser.add_argument("--api-repeat", type=int, default=20)
+    parser.add_argument("--startup-repeat", type=int, default=5, help="Cold starts per startup mode")
+    parser.add_argument("--db-writers", type=int, default=8, help="Writer threads in the db load test")
+    parser.add_argument("--db-readers", type=int, default=4, help="Reader threads in the db load test")
+    parser.add_argument("--db-seconds", type=float, default=5.0, help="Duration per profile")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--check", default=None, help="Thresholds JSON to gate on")
+    args = parser.parse_args(argv)
+
+    # Must happen before `app` is imported: the engine reads DATABASE_URL at import.
+    tmp = tempfile.mkdtemp(prefix="lonn-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+
+    import numpy
+    from app.config import settings
+    from . import engine, api
+
+    results = []
+    if args.suite in ("engine", "all"):
+        results += engine.run(args.sizes)
+    if args.suite in ("api", "all"):
+        results += api.run(args.api_sizes, args.api_repeat)
+    if args.suite in ("startup", "all"):
+        from . import startup
+        results += startup.run(args.startup_repeat)
+    if args.suite == "db":
+        from . import db_load
+        results += db_load.run(tmp, args.db_writers, args.db_readers, args.db_seconds)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "db_async": settings.DB_ASYNC,
+            "argv": sys.argv[1:] if argv is None else argv,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.check:
+        with open(args.check) as f:
+            thresholds = {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+        failures = check(results, thresholds)
+        for message in failures:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
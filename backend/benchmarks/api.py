@@ -0,0 +1,155 @@
+"""
+End-to-end benchmarks through FastAPI's ASGI app (httpx.ASGITransport).
+
+Runs against the database in DATABASE_URL, which the runner points at a
+temporary SQLite file before anything from `app` is imported. For each size
+the database is reseeded with that many shifts spread over users; requests
+are made as the first user, who has a year's rota.
+
+The *.concurrent cases time a burst of simultaneous requests; comparing a
+run with DB_ASYNC=true against one with DB_ASYNC=false is the A/B test of
+the async session path against the threadpool.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import SessionLocal, async_engine
+from app.main import app, create_tables
+from app.models.month_summary import MonthSummary
+from app.models.shift import Shift
+from app.models.shift_aggregate import MonthAggregate, WeekAggregate
+from app.models.user import User
+from app.models.wage_settings import WageSettings
+from app.services.rate_plan import compile_rate_plan
+from app.services.wage_engine import calculate_shifts_batch
+from app.utils.parsing import parse_date
+from app.utils.security import create_access_token
+from app.utils.time_utils import shift_span
+
+from . import data
+from .timing import summarise
+
+_INSERT_CHUNK = 5000
+_CONCURRENCY = 32               # simultaneous requests in the *.concurrent cases
+
+
+def _minutes(row: Dict) -> Dict:
+    # Core inserts skip the ORM hook that derives these on Shift
+    _, start, end = shift_span(row["date"], row["start_time"], row["end_time"])
+    return {"start_min": start, "end_min": end}
+
+
+def _reset(db):
+    for model in (WeekAggregate, MonthAggregate, MonthSummary, Shift, WageSettings, User):
+        db.query(model).delete()
+    db.commit()
+
+
+def _seed(n: int) -> int:
+    """Insert n shifts (with calculated values) and return the first user's id."""
+    create_tables()
+    db = SessionLocal()
+    try:
+        _reset(db)
+        rows = data.shifts(n)
+        user_ids = {}
+        for index in sorted({r["user"] for r in rows}):
+            user = User(email=f"bench{index}@example.com", password_hash="-", name=f"Bench {index}", is_active=True)
+            db.add(user)
+            db.flush()
+            db.add(WageSettings(user_id=user.id, **data.wage_settings()))
+            user_ids[index] = user.id
+        db.commit()
+        plan = compile_rate_plan(WageSettings(**data.wage_settings()))
+        for i in range(0, len(rows), _INSERT_CHUNK):
+            chunk = rows[i:i + _INSERT_CHUNK]
+            values = calculate_shifts_batch(data.as_objects(chunk), plan)
+            db.execute(insert(Shift), [
+                {"user_id": user_ids[r.pop("user")], **r, **v, "date": parse_date(r["date"]), **_minutes(r)}
+                for r, v in zip(chunk, values)
+            ])
+        db.commit()
+        return user_ids[0]
+    finally:
+        db.close()
+
+
+async def _measure(name: str, n: int, repeat: int, request: Callable[[], Awaitable[httpx.Response]]) -> Dict:
+    response = await request()                 # warm-up, also checks the route works
+    response.raise_for_status()
+    samples: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = await request()
+        samples.append((time.perf_counter() - t0) * 1000)
+        response.raise_for_status()
+    return summarise(name, n, samples)
+
+
+async def _run_size(n: int, repeat: int) -> List[Dict]:
+    user_id = _seed(n)
+    headers = {"Authorization": f"Bearer {create_access_token(user_id, False)}"}
+    month = {"year": 2024, "month": 3}
+    simulate = {**month, "scenarios": [{"settings": {"hourly_rate": 260}}, {"settings": {"night_from": "23:00"}}]}
+    projected = {"year": 2024, "fields": "id,date,start_time,end_time,gross_pay"}
+    grid = {"from": "2024-02-26", "to": "2024-04-07"}     # six-week view of March
+    shift = {"date": "2024-03-15", "start_time": "22:00", "end_time": "06:00", "pause_min": 0}
+
+    async def create_and_delete():
+        created = await client.post("/api/shifts", json=shift, headers=headers)
+        created.raise_for_status()
+        return await client.delete(f"/api/shifts/{created.json()['id']}", headers=headers)
+
+    async def concurrent(path: str, params: Dict):
+        responses = await asyncio.gather(*(client.get(path, params=params, headers=headers) for _ in range(_CONCURRENCY)))
+        for r in responses[1:]:
+            r.raise_for_status()
+        return responses[0]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        etag = (await client.get("/api/calculator/month", params=month, headers=headers)).headers["etag"]
+
+        async def not_modified():
+            r = await client.get("/api/calculator/month", params=month, headers={**headers, "If-None-Match": etag})
+            if r.status_code != 304:
+                raise RuntimeError(f"expected 304, got {r.status_code}")
+            return httpx.Response(200, request=r.request)     # for _measure's status check
+
+        since = (await client.get("/api/sync", params={"limit": 1}, headers=headers)).json()["cursor"]
+
+        # not_modified goes first: create_delete below moves the revision on.
+        results = [
+            await _measure("api.calculator.month.not_modified", n, repeat, not_modified),
+            await _measure("api.shifts.list_month", n, repeat, lambda: client.get("/api/shifts", params=month, headers=headers)),
+            await _measure("api.shifts.list_year", n, repeat, lambda: client.get("/api/shifts", params={"year": 2024}, headers=headers)),
+            await _measure("api.shifts.list_page", n, repeat, lambda: client.get("/api/shifts", params={"limit": 200}, headers=headers)),
+            await _measure("api.shifts.list_year.projected", n, repeat, lambda: client.get("/api/shifts", params=projected, headers=headers)),
+            await _measure("api.calendar.grid", n, repeat, lambda: client.get("/api/calendar", params=grid, headers=headers)),
+            await _measure("api.shifts.create_delete", n, repeat, create_and_delete),
+            # The writes create_delete just made, as an offline client would fetch them.
+            await _measure("api.sync.delta", n, repeat, lambda: client.get("/api/sync", params={"since": since}, headers=headers)),
+            await _measure("api.calculator.month", n, repeat, lambda: client.get("/api/calculator/month", params=month, headers=headers)),
+            await _measure("api.calculator.month.concurrent", n, repeat, lambda: concurrent("/api/calculator/month", month)),
+            await _measure("api.shifts.list_month.concurrent", n, repeat, lambda: concurrent("/api/shifts", month)),
+            await _measure("api.calculator.year", n, repeat, lambda: client.get("/api/calculator/year", params={"year": 2024}, headers=headers)),
+            await _measure("api.calculator.simulate", n, repeat, lambda: client.post("/api/calculator/simulate", json=simulate, headers=headers)),
+            await _measure("api.export.csv", n, repeat, lambda: client.get("/api/export/csv", params=month, headers=headers)),
+        ]
+    # ASGITransport does not run the app's shutdown; pooled async connections
+    # belong to this event loop and must be closed before it ends.
+    if async_engine is not None:
+        await async_engine.dispose()
+    return results
+
+
+def run(sizes: List[int], repeat: int = 20) -> List[Dict]:
+    results: List[Dict] = []
+    for n in sizes:
+        results.extend(asyncio.run(_run_size(n, repeat)))
+    return results
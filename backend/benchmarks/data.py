@@ -0,0 +1,72 @@
+"""
+Synthetic, reproducible data for the benchmarks.
+
+Shifts follow a rotating rota per user: day, evening and night shifts with
+days off in between, so a year of data covers weekends, night shifts that
+cross midnight and the Norwegian public holidays. Larger sizes spread over
+more users instead of more years, as in production.
+"""
+
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Dict, List
+
+SHIFTS_PER_USER = 250           # about one working year
+START_DATE = date(2024, 1, 1)
+
+# (start, end, pause) per shift type; None = day off
+_ROTA = [
+    ("07:00", "15:00", 30), ("07:00", "15:00", 30), ("07:00", "15:00", 30), None, None,
+    ("15:00", "23:00", 30), ("15:00", "23:00", 30), ("14:30", "22:30", 30), None,
+    ("22:00", "07:00", 0), ("22:00", "07:00", 0), ("21:45", "07:15", 0), None, None,
+]
+
+
+def wage_settings(seed: int = 0) -> Dict:
+    """Settings with every allowance enabled, as a WageSettings kwargs dict."""
+    rng = random.Random(seed)
+    return dict(
+        hourly_rate=rng.choice([210.0, 231.37, 245.5]),
+        evening_allowance_type="kr", evening_allowance_value=25.0,
+        night_allowance_type="percent", night_allowance_value=25.0,
+        weekend_allowance_type="kr", weekend_allowance_value=50.0,
+        holiday_allowance_type="percent", holiday_allowance_value=100.0,
+        rounding_minutes=rng.choice([0, 15]),
+    )
+
+
+def rota(n: int, user: int = 0, seed: int = 0) -> List[Dict]:
+    """n shifts of one user's rota starting at START_DATE, as dicts."""
+    rng = random.Random(seed * 100003 + user)
+    offset = rng.randrange(len(_ROTA))
+    out: List[Dict] = []
+    day = 0
+    while len(out) < n:
+        slot = _ROTA[(day + offset) % len(_ROTA)]
+        if slot is not None:
+            start, end, pause = slot
+            out.append({
+                "date": (START_DATE + timedelta(days=day)).isoformat(),
+                "start_time": start,
+                "end_time": end,
+                "pause_min": pause,
+            })
+        day += 1
+    return out
+
+
+def shifts(n: int, seed: int = 0) -> List[Dict]:
+    """n shifts over ceil(n / SHIFTS_PER_USER) users; each dict has a 'user' index."""
+    out: List[Dict] = []
+    user = 0
+    while len(out) < n:
+        for s in rota(min(SHIFTS_PER_USER, n - len(out)), user, seed):
+            out.append({"user": user, **s})
+        user += 1
+    return out
+
+
+def as_objects(rows: List[Dict]) -> List[SimpleNamespace]:
+    """Attribute access, like Shift rows, for the engine functions."""
+    return [SimpleNamespace(**r) for r in rows]
@@ -0,0 +1,130 @@
+"""
+Concurrent load test for the database profiles (DB_PROFILE).
+
+For each profile a fresh SQLite file gets its own engine, built the same
+way as the app's. Writer threads then insert shifts one transaction at a
+time, as POST /api/shifts does, while reader threads run the month query,
+for a fixed duration. Results report per-operation latency, throughput and
+how many operations failed with "database is locked".
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PoolMetrics, build_engine
+from app.models.shift import Shift
+from app.models.user import User
+from app.utils.time_utils import month_range
+
+from . import data
+from .timing import summarise
+
+PROFILES = ("plain", "tuned")
+
+
+def _worker(stop: threading.Event, op, samples: List[float], errors: List[str]):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            op()
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        samples.append((time.perf_counter() - t0) * 1000)
+
+
+def _run_profile(directory: str, profile: str, writers: int, readers: int, seconds: float) -> List[Dict]:
+    path = os.path.join(directory, f"load-{profile}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    metrics = PoolMetrics()
+    engine = build_engine(f"sqlite:///{path}", profile, metrics)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autoflush=False, bind=engine)
+
+    with Session() as db:
+        users = [User(email=f"load{i}@example.com", password_hash="-", name=f"Load {i}", is_active=True)
+                 for i in range(max(writers, 1))]
+        db.add_all(users)
+        db.commit()
+        user_ids = [u.id for u in users]
+    rota = data.rota(data.SHIFTS_PER_USER)
+
+    def writer(user_id: int):
+        rng = random.Random(user_id)
+
+        def op():
+            shift = rng.choice(rota)
+            with Session() as db:
+                db.add(Shift(
+                    user_id=user_id,
+                    date=date.fromisoformat(shift["date"]) + timedelta(days=rng.randrange(7)),
+                    start_time=shift["start_time"],
+                    end_time=shift["end_time"],
+                    pause_min=shift["pause_min"],
+                ))
+                db.commit()
+        return op
+
+    def reader(user_id: int):
+        rng = random.Random(-user_id)
+
+        def op():
+            with Session() as db:
+                db.query(Shift.id, Shift.date, Shift.start_time, Shift.end_time).filter(
+                    Shift.user_id == user_id, Shift.date.between(*month_range(2024, rng.randint(1, 12)))
+                ).all()
+        return op
+
+    stop = threading.Event()
+    jobs = (
+        [("write", writer(user_ids[i % len(user_ids)])) for i in range(writers)]
+        + [("read", reader(user_ids[i % len(user_ids)])) for i in range(readers)]
+    )
+    samples: Dict[str, List[float]] = {"write": [], "read": []}
+    errors: Dict[str, List[str]] = {"write": [], "read": []}
+    threads = [
+        threading.Thread(target=_worker, args=(stop, op, samples[kind], errors[kind]), daemon=True)
+        for kind, op in jobs
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    pool = metrics.stats()
+    results = []
+    for kind, count in (("write", writers), ("read", readers)):
+        if not count:
+            continue
+        result = summarise(f"db.load.{profile}.{kind}", count, samples[kind] or [0.0])
+        result.update(
+            ops=len(samples[kind]),
+            ops_per_s=round(len(samples[kind]) / elapsed, 1),
+            errors=len(errors[kind]),
+            locked_errors=sum("locked" in e for e in errors[kind]),
+            pool_wait_p95_ms=pool["wait_ms"]["p95"],
+            seconds=round(elapsed, 2),
+        )
+        results.append(result)
+    return results
+
+
+def run(directory: str, writers: int = 8, readers: int = 4, seconds: float = 5.0) -> List[Dict]:
+    results: List[Dict] = []
+    for profile in PROFILES:
+        results.extend(_run_profile(directory, profile, writers, readers, seconds))
+    return results
@@ -0,0 +1,116 @@
+"""
+Micro-benchmarks for the wage engine, time_utils and holiday_service.
+
+Also checks that calculate_shifts_batch returns exactly what
+calculate_shift does, so an optimisation cannot change pay unnoticed.
+"""
+
+from datetime import date, datetime, timedelta
+from itertools import product
+from typing import Dict, List
+
+import numpy as np
+
+from app.models.wage_settings import WageSettings
+from app.services.calc_cache import shift_cache
+from app.services.holiday_service import holiday_flags, is_norwegian_holiday
+from app.services.rate_plan import compile_rate_plan
+from app.services.wage_engine import (
+    calculate_month, calculate_period, calculate_shift, calculate_shifts_batch,
+)
+from app.utils.parsing import clock_minutes, decode_date
+from app.utils.time_utils import EVENING, NIGHT, WEEKEND, segment_shift, shift_span
+
+from . import data
+from .timing import measure, repeats_for
+
+
+def run(sizes: List[int]) -> List[Dict]:
+    plan = compile_rate_plan(WageSettings(**data.wage_settings()))
+    windows = {EVENING: plan.evening_window, NIGHT: plan.night_window}
+    results = []
+
+    for n in sizes:
+        shifts = data.as_objects(data.shifts(n))
+        repeat = repeats_for(n)
+
+        def scalar():
+            for s in shifts:
+                calculate_shift(s, plan)
+
+        results.append(measure("engine.calculate_shift.cold", scalar, n, repeats_for(n, 50_000), setup=shift_cache.clear))
+        results.append(measure("engine.calculate_shift.warm", scalar, n, repeats_for(n, 50_000)))
+        results.append(measure("engine.calculate_shifts_batch", lambda: calculate_shifts_batch(shifts, plan), n, repeat))
+        results.append(measure("engine.calculate_month", lambda: calculate_month(shifts, plan), n, repeat))
+        ordered = sorted(shifts, key=lambda s: s.date)
+        results.append(measure("engine.calculate_period", lambda: calculate_period(ordered, plan, "2024-01-01"), n, repeat))
+
+        def segments():
+            for s in shifts:
+                _, start, end = shift_span(s.date, s.start_time, s.end_time)
+                segment_shift(start, end, windows, (WEEKEND, 0))
+
+        results.append(measure("time_utils.shift_span+segment_shift", segments, n, repeats_for(n, 50_000)))
+
+    # One user's month, the shape of a /api/calculator/month request
+    month = data.as_objects([s for s in data.rota(data.SHIFTS_PER_USER) if s["date"].startswith("2024-03")])
+    results.append(measure("engine.calculate_month.one_user", lambda: calculate_month(month, plan), len(month), 200))
+
+    results += _parsing()
+    results.append(_batch_matches_scalar())
+
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(366 * 4)]
+    results.append(measure("holiday_service.is_norwegian_holiday", lambda: [is_norwegian_holiday(d) for d in days], len(days), 20))
+    ordinals = np.array([d.toordinal() for d in days], dtype=np.int64)
+    results.append(measure("holiday_service.holiday_flags", lambda: holiday_flags(ordinals), len(days), 200))
+    return results
+
+
+# Shifts compared per settings variant: several users' rotas over a year,
+# so weekends, holidays and night shifts across midnight are all covered.
+_MATCH_SHIFTS = 5000
+
+
+def _batch_matches_scalar() -> Dict:
+    """
+    Compare calculate_shifts_batch with calculate_shift on every rounding and
+    pause variant. Gated with {"mismatches": 0}: any difference fails --check.
+    """
+    shifts = data.as_objects(data.shifts(_MATCH_SHIFTS, seed=1))
+    compared = mismatches = 0
+    first = None
+    for minutes, method, paid_pause in product((0, 15), ("nearest", "up", "down"), (False, True)):
+        settings = {**data.wage_settings(), "rounding_minutes": minutes, "rounding_method": method, "paid_pause": paid_pause}
+        plan = compile_rate_plan(WageSettings(**settings))
+        for s, batch in zip(shifts, calculate_shifts_batch(shifts, plan)):
+            scalar = calculate_shift(s, plan)
+            compared += 1
+            if batch != scalar:
+                mismatches += 1
+                first = first or {"shift": vars(s), "settings": settings, "scalar": scalar, "batch": batch}
+    name = "engine.batch_matches_scalar"
+    return {"name": name, "n": compared, "key": f"{name}/n={compared}", "mismatches": mismatches, "first_mismatch": first}
+
+
+def _strptime_clock(time_str: str) -> int:
+    t = datetime.strptime(time_str, "%H:%M")
+    return t.hour * 60 + t.minute
+
+
+def _strptime_date(date_str: str) -> tuple:
+    d = datetime.strptime(date_str, "%Y-%m-%d").date()
+    return d.toordinal(), d.weekday(), d.isocalendar()[1]
+
+
+def _parsing() -> List[Dict]:
+    """Parsing layer against the strptime code it replaced."""
+    times = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)]
+    dates = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(366 * 4)]
+    return [
+        measure("parsing.clock_minutes", lambda: [clock_minutes(t) for t in times], len(times), 50),
+        measure("parsing.clock_minutes.strptime", lambda: [_strptime_clock(t) for t in times], len(times), 50),
+        measure("parsing.decode_date.cold", lambda: [decode_date(d) for d in dates], len(dates), 50,
+                setup=decode_date.cache_clear),
+        measure("parsing.decode_date.warm", lambda: [decode_date(d) for d in dates], len(dates), 50),
+        measure("parsing.decode_date.strptime", lambda: [_strptime_date(d) for d in dates], len(dates), 50),
+    ]
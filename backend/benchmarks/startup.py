@@ -0,0 +1,65 @@
+"""
+Cold-start benchmark.
+
+Each sample is a fresh interpreter that imports app.main and runs its
+startup handlers against the runner's temporary database, once per
+STARTUP_MODE. The result is the wall time from spawning the process to the
+app being ready (interpreter start included), with the app's own phase
+timings alongside. The cold-start budget lives in thresholds.json, so a
+release run with --check fails when workers start slower than that.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from .timing import summarise
+
+MODES = ("fast", "full")
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import asyncio, json, sys
+from app.main import app
+from app.utils.startup import startup_timings
+asyncio.run(app.router.startup())
+json.dump(startup_timings.report(), sys.stdout)
+"""
+
+
+def _init_db(env: Dict[str, str]):
+    # Both modes start against an initialised database, as after a deploy.
+    subprocess.run([sys.executable, "-m", "app.cli", "init-db"], cwd=_BACKEND, env=env, check=True)
+
+
+def _sample(env: Dict[str, str]) -> tuple:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _CHILD], cwd=_BACKEND, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return (time.perf_counter() - t0) * 1000, json.loads(out)
+
+
+def run(repeat: int = 5) -> List[Dict]:
+    env = dict(os.environ)
+    _init_db(env)
+    results = []
+    for mode in MODES:
+        samples, reports = [], []
+        for _ in range(repeat):
+            wall, report = _sample({**env, "STARTUP_MODE": mode})
+            samples.append(wall)
+            reports.append(report)
+        result = summarise(f"startup.cold.{mode}", 1, samples)
+        result.update(
+            ready_ms=round(statistics.median(r["ready_ms"] for r in reports), 3),
+            phases_ms={
+                name: round(statistics.median(r["phases"][name] for r in reports), 3)
+                for name in reports[0]["phases"]
+            },
+        )
+        results.append(result)
+    return results
@@ -0,0 +1,45 @@
+"""Timing helpers shared by the benchmark suites."""
+
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def repeats_for(n: int, budget: int = 200_000, most: int = 20) -> int:
+    """Fewer repeats for larger inputs so a suite finishes in reasonable time."""
+    return max(1, min(most, budget // max(n, 1)))
+
+
+def measure(
+    name: str,
+    fn: Callable[[], object],
+    n: int,
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+) -> Dict:
+    """Run fn `repeat` times (after one warm-up) and summarise in milliseconds."""
+    if setup:
+        setup()
+    fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return summarise(name, n, samples)
+
+
+def summarise(name: str, n: int, samples: List[float]) -> Dict:
+    median = statistics.median(samples)
+    return {
+        "name": name,
+        "n": n,
+        "key": f"{name}/n={n}",
+        "repeat": len(samples),
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(median, 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "per_item_us": round(median * 1000 / n, 4) if n else None,
+    }
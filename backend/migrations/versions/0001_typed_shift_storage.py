@@ -0,0 +1,127 @@
+"""Typed shift storage: Date column, start/end minutes and a (user_id, date) index
+
+Shift.date was a String(10) queried with LIKE 'YYYY-MM%'. This turns it into
+a DATE column (on SQLite the ISO text storage stays as it is), adds start_min/end_min (minutes since midnight of the shift
+day, end_min > start_min) and a composite (user_id, date) index so month and
+range queries become index range scans.
+
+Existing rows are backfilled in id-ordered chunks. Every step checks the
+current schema first, so the migration can be re-run after an interruption
+and is a no-op on a database created by the current models.
+
+Revision ID: 0001_typed_shift_storage
+Revises:
+Create Date: 2026-10-17
+"""
+
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_typed_shift_storage"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+_INDEX = "ix_shifts_user_id_date"
+_CHUNK = 1000
+
+_shifts = sa.table(
+    "shifts",
+    sa.column("id", sa.Integer),
+    sa.column("date", sa.String),
+    sa.column("start_time", sa.String),
+    sa.column("end_time", sa.String),
+    sa.column("start_min", sa.Integer),
+    sa.column("end_min", sa.Integer),
+)
+
+
+def _minutes(time_str: str) -> int:
+    t = datetime.strptime(time_str, "%H:%M")
+    return t.hour * 60 + t.minute
+
+
+def _iso(value) -> str:
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.strptime(value.strip(), "%Y-%m-%d").date().isoformat()
+
+
+def _backfill(bind):
+    """Normalise dates to YYYY-MM-DD and derive the minute columns where missing."""
+    update = _shifts.update().where(_shifts.c.id == sa.bindparam("_id")).values(
+        date=sa.bindparam("_date"),
+        start_min=sa.bindparam("_start"),
+        end_min=sa.bindparam("_end"),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(_shifts.c.id, _shifts.c.date, _shifts.c.start_time, _shifts.c.end_time)
+            .where(_shifts.c.id > last_id, _shifts.c.start_min.is_(None))
+            .order_by(_shifts.c.id)
+            .limit(_CHUNK)
+        ).all()
+        if not rows:
+            return
+        params = []
+        for row in rows:
+            start, end = _minutes(row.start_time), _minutes(row.end_time)
+            try:
+                day = _iso(row.date)
+            except (TypeError, ValueError):
+                raise RuntimeError(f"shift {row.id}: invalid date {row.date!r}; fix it and re-run the migration")
+            params.append({"_id": row.id, "_date": day, "_start": start, "_end": end if end > start else end + 1440})
+        bind.execute(update, params)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "shifts" not in inspector.get_table_names():
+        return  # new database: create_all builds the current schema
+    columns = {c["name"]: c for c in inspector.get_columns("shifts")}
+
+    with op.batch_alter_table("shifts") as batch:
+        if "start_min" not in columns:
+            batch.add_column(sa.Column("start_min", sa.Integer, nullable=True))
+        if "end_min" not in columns:
+            batch.add_column(sa.Column("end_min", sa.Integer, nullable=True))
+
+    _backfill(bind)
+
+    # SQLite has no date type: SQLAlchemy's Date stores the same ISO text the
+    # column already holds, and a batch type change would CAST it to a number.
+    if bind.dialect.name != "sqlite" and not isinstance(columns["date"]["type"], sa.Date):
+        with op.batch_alter_table("shifts") as batch:
+            batch.alter_column(
+                "date",
+                existing_type=sa.String(10),
+                type_=sa.Date(),
+                existing_nullable=False,
+                postgresql_using="date::date",
+            )
+
+    if _INDEX not in {i["name"] for i in sa.inspect(bind).get_indexes("shifts")}:
+        op.create_index(_INDEX, "shifts", ["user_id", "date"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if _INDEX in {i["name"] for i in inspector.get_indexes("shifts")}:
+        op.drop_index(_INDEX, table_name="shifts")
+    with op.batch_alter_table("shifts") as batch:
+        if bind.dialect.name != "sqlite":
+            batch.alter_column(
+                "date",
+                existing_type=sa.Date(),
+                type_=sa.String(10),
+                existing_nullable=False,
+                postgresql_using="to_char(date, 'YYYY-MM-DD')",
+            )
+        batch.drop_column("end_min")
+        batch.drop_column("start_min")
@@ -0,0 +1,33 @@
+"""Per-user data revisions for ETags
+
+Adds user_revisions (user_id, revision). Rows are created on a user's first
+write, so existing users simply start without one (revision 0).
+
+Revision ID: 0002_user_revisions
+Revises: 0001_typed_shift_storage
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_user_revisions"
+down_revision = "0001_typed_shift_storage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables or "user_revisions" in tables:
+        return  # new database (create_all builds it) or already applied
+    op.create_table(
+        "user_revisions",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("revision", sa.Integer, nullable=False),
+    )
+
+
+def downgrade():
+    if "user_revisions" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table("user_revisions")
@@ -0,0 +1,42 @@
+"""Change log for the sync feed
+
+Adds sync_changes: the latest revision that wrote each of a user's shifts,
+templates, wage settings and summaries, with tombstones for deletes. Data
+written before this revision has no rows; clients pick it up with a full
+sync (since=0).
+
+Revision ID: 0003_sync_changes
+Revises: 0002_user_revisions
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_sync_changes"
+down_revision = "0002_user_revisions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables or "sync_changes" in tables:
+        return  # new database (create_all builds it) or already applied
+    op.create_table(
+        "sync_changes",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("entity", sa.String(20), nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=False),
+        sa.Column("revision", sa.Integer, nullable=False),
+        sa.Column("deleted", sa.Boolean, nullable=False),
+        sa.UniqueConstraint("user_id", "entity", "entity_id", name="uq_sync_changes_entity"),
+    )
+    op.create_index("ix_sync_changes_user_id_revision", "sync_changes", ["user_id", "revision"])
+
+
+def downgrade():
+    if "sync_changes" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index("ix_sync_changes_user_id_revision", table_name="sync_changes")
+        op.drop_table("sync_changes")
@@ -0,0 +1,49 @@
+"""Covering index for admin analytics
+
+Adds ix_shifts_user_id_date_totals on (user_id, date) plus the summed
+columns, so the admin analytics GROUP BY user_id over a date range reads the
+index alone instead of the shift rows. It starts with the same columns as
+ix_shifts_user_id_date, which is dropped: every range lookup can use the new
+index, and shift writes keep one (user_id, date) index to maintain.
+
+Revision ID: 0004_shift_analytics_index
+Revises: 0003_sync_changes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_shift_analytics_index"
+down_revision = "0003_sync_changes"
+branch_labels = None
+depends_on = None
+
+_INDEX = "ix_shifts_user_id_date_totals"
+_OLD_INDEX = "ix_shifts_user_id_date"
+_COLUMNS = [
+    "user_id", "date", "total_hours", "gross_pay",
+    "overtime_50_hours", "overtime_100_hours", "night_hours", "weekend_hours",
+]
+
+
+def _indexes():
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("shifts")}
+
+
+def upgrade():
+    if "shifts" not in sa.inspect(op.get_bind()).get_table_names():
+        return  # new database: create_all builds it
+    indexes = _indexes()
+    if _INDEX not in indexes:
+        op.create_index(_INDEX, "shifts", _COLUMNS)
+    if _OLD_INDEX in indexes:
+        op.drop_index(_OLD_INDEX, table_name="shifts")
+
+
+def downgrade():
+    indexes = _indexes()
+    if _OLD_INDEX not in indexes:
+        op.create_index(_OLD_INDEX, "shifts", ["user_id", "date"])
+    if _INDEX in indexes:
+        op.drop_index(_INDEX, table_name="shifts")
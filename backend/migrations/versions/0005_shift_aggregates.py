@@ -0,0 +1,64 @@
+"""Month and ISO-week aggregate tables
+
+month_aggregates and week_aggregates were only created by create_all, so a
+database managed by Alembic alone never got them. Rows are not backfilled:
+a month's row is seeded from its stored shifts on the first write to it, and
+until then the calculator reads the shifts.
+
+Revision ID: 0005_shift_aggregates
+Revises: 0004_shift_analytics_index
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_shift_aggregates"
+down_revision = "0004_shift_analytics_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables:
+        return  # new database: create_all builds it
+    if "month_aggregates" not in tables:
+        op.create_table(
+            "month_aggregates",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("year", sa.Integer, nullable=False),
+            sa.Column("month", sa.Integer, nullable=False),
+            sa.Column("shift_count", sa.Integer),
+            *(sa.Column(name, sa.Float) for name in (
+                "total_hours", "base_hours", "evening_hours", "night_hours", "weekend_hours",
+                "holiday_hours", "overtime_50_hours", "overtime_100_hours", "gross_pay",
+            )),
+            sa.Column("settings_version", sa.String(16), nullable=True),
+            sa.Column("updated_at", sa.DateTime),
+            sa.UniqueConstraint("user_id", "year", "month", name="uq_agg_user_year_month"),
+        )
+        op.create_index("ix_month_aggregates_id", "month_aggregates", ["id"])
+    if "week_aggregates" not in tables:
+        op.create_table(
+            "week_aggregates",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("year", sa.Integer, nullable=False),
+            sa.Column("month", sa.Integer, nullable=False),
+            sa.Column("iso_year", sa.Integer, nullable=False),
+            sa.Column("iso_week", sa.Integer, nullable=False),
+            sa.Column("shift_count", sa.Integer),
+            sa.Column("total_hours", sa.Float),
+            sa.UniqueConstraint("user_id", "year", "month", "iso_year", "iso_week", name="uq_agg_user_month_week"),
+        )
+        op.create_index("ix_week_aggregates_id", "week_aggregates", ["id"])
+
+
+def downgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    for table in ("week_aggregates", "month_aggregates"):
+        if table in tables:
+            op.drop_index(f"ix_{table}_id", table_name=table)
+            op.drop_table(table)
@@ -0,0 +1,34 @@
+"""Data generation counter
+
+Adds data_generation, a single row incremented with every user revision and
+on user deletion. The admin analytics cache is keyed on it. The row is
+created by the first write, so an existing database starts at generation 0.
+
+Revision ID: 0006_data_generation
+Revises: 0005_shift_aggregates
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_data_generation"
+down_revision = "0005_shift_aggregates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables or "data_generation" in tables:
+        return  # new database (create_all builds it) or already applied
+    op.create_table(
+        "data_generation",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("generation", sa.Integer, nullable=False),
+    )
+
+
+def downgrade():
+    if "data_generation" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table("data_generation")